@@ -0,0 +1,649 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Benchmarks for KW extraction.
+
+chunker: time the table driven candidate chunker (chunker.py) against the
+former re.match based make_candidate_kw loop (kept here as reference) and
+check that they give the same output.
+
+neighbours: time the one pass complex keyword detection (kw_helpers.py)
+against the former loop over the phrases and their occurrences (kept here
+as reference) for gaps from 1 to --gap, and check that they give the same
+output.
+
+textrank: time the array based TextRank engine (textrank.py) against the
+former pygraph digraph and pagerank setup (kept here as reference, needs
+pygraph) and check that they give the same scores (the same floats) for
+the candidates of the input entries, with wordforms and lemmas.
+
+stages: time each stage of the extraction separately over the input (or a
+synthetic corpus made from it with -N), report peak memory, and compare
+with (or save) a baseline json file.
+
+server: load test an extraction server (kwserver.py) at --address, or a
+server started on a temporary Unix socket: --clients concurrent clients
+send the input entries in requests of --size entries, and the throughput
+and the client and server side p50/p99 latencies are reported.
+
+corpus: write a synthetic corpus made from the input (eg. basetest.nlp) to
+stdout. Documents are made of POS sequences of input sentences filled with
+random tokens of the same POS, common words get synthetic variants to give
+a larger vocabulary.
+
+@Author: oraveczcsaba
+"""
+
+import os
+import sys
+import argparse
+import json
+import re
+import math
+import random
+import resource
+import collections
+import itertools
+import timeit
+import time
+import shutil
+import socket
+import tempfile
+import threading
+import subprocess
+import extractor
+import kwserver
+import rake
+from kw_helpers import neighbours, merge_dict, topranked, check_inter, \
+    combine_scores, unique, post_textrank
+from chunker import make_candidates
+from document import make_document
+from vocab import Vocabulary
+from resources import load_table
+
+ap = argparse.ArgumentParser(
+    description="""
+    Benchmark KW extraction stages.
+    """)
+ap.add_argument('-n', action='store', dest='repeat', type=int, default=20,
+                help='number of runs over the input')
+ap.add_argument('-p', action='store', dest='pos', type=str,
+                default='N.*,J.*',
+                help='(comma separated list of) pos regexps to include')
+ap.add_argument('-N', '--docs', action='store', dest='docs', type=int,
+                default=0,
+                help='number of synthetic documents made from the input '
+                '(0: use the input as is)')
+ap.add_argument('--length', action='store', dest='length', type=int,
+                default=200, help='median tokens of synthetic documents')
+ap.add_argument('--spread', action='store', dest='spread', type=float,
+                default=0.5,
+                help='sigma of the lognormal length distribution of '
+                'synthetic documents')
+ap.add_argument('--vocab', action='store', dest='vocab', type=int,
+                default=5000,
+                help='number of synthetic word variants')
+ap.add_argument('--seed', action='store', dest='seed', type=int, default=1,
+                help='random seed of the synthetic corpus')
+ap.add_argument('--gap', action='store', dest='gap', type=int, default=8,
+                help='largest gap of the neighbours benchmark')
+ap.add_argument('--save', action='store', dest='save', type=str,
+                help='save stage timings as baseline json file')
+ap.add_argument('--baseline', action='store', dest='baseline', type=str,
+                help='compare stage timings with baseline json file')
+ap.add_argument('--tolerance', action='store', dest='tolerance',
+                type=float, default=0.1,
+                help='relative slowdown reported as regression')
+ap.add_argument('--address', action='store', dest='address', type=str,
+                help='server address (host:port or Unix socket path) of '
+                'the server benchmark (default: start a server)')
+ap.add_argument('--clients', action='store', dest='clients', type=int,
+                default=8,
+                help='number of concurrent clients of the server benchmark')
+ap.add_argument('--size', action='store', dest='size', type=int, default=1,
+                help='entries per request of the server benchmark')
+ap.add_argument('--version', action='version', version='%(prog)s 0.2')
+ap.add_argument('bench', choices=['chunker', 'neighbours', 'textrank',
+                                  'stages', 'server', 'corpus'],
+                help='benchmark to run')
+ap.add_argument('input', nargs='?', default='basetest.nlp',
+                help='input json (list of entries)')
+args = ap.parse_args()
+
+
+def legacy_make_candidate_kw(sentences, stopwords, lemma, poslist):
+    """(list, dict, int, list) -> list, dict, dict
+
+    The make_candidate_kw loop before the table driven chunker.
+    """
+
+    phrase_list = []
+    phrase_count = 0
+    phrase_by_token = collections.defaultdict(lambda: [])
+    phrase_by_index = collections.defaultdict(lambda: [])
+    for sentence in sentences:
+        prevpos = 'X'
+        phrase = []
+        firstindex = 0
+        for wtuple in sentence:
+            pos = wtuple[2]
+            word = wtuple[lemma]
+            word_index = wtuple[3]
+            firstindex = firstindex if len(phrase) else word_index
+            skip = 1 if poslist else 0
+            adjskip = 1 if (prevpos[0] == 'N' and pos[0] == 'J') else 0
+            prevpos = pos
+            if [pos for fpos in poslist if re.match(fpos, pos)]:
+                skip = 0
+            if word in stopwords or skip or adjskip:
+                if word in stopwords:
+                    adjskip = 0
+                word_index = word_index - 1
+                if len(phrase) > 0:
+                    phrase_list.append(phrase)
+                    phrase_by_token[tuple(phrase)].append(phrase_count)
+                    phrase_by_index[phrase_count] = ((tuple(phrase),
+                                                      firstindex,
+                                                      word_index))
+                    phrase_count += 1
+                    phrase = []
+                if adjskip:
+                    firstindex = word_index + 1
+                    phrase.append(word)
+            else:
+                phrase.append(word)
+        if len(phrase) > 0:
+            phrase_list.append(phrase)
+            phrase_by_token[tuple(phrase)].append(phrase_count)
+            phrase_by_index[phrase_count] = ((tuple(phrase),
+                                              firstindex,
+                                              word_index))
+            phrase_count += 1
+    return phrase_list, phrase_by_token, phrase_by_index
+
+
+def bench_chunker(entries, poslist, repeat):
+    """ (list, list, int) -> None
+
+    Compare and time the legacy and the table driven chunker.
+    """
+
+    postable = extractor.postable_for(poslist)
+    stopwords = load_table('stopwords').frozenset()
+    docs = []
+    for nlp_entry in entries:
+        vocab = Vocabulary()
+        doc = make_document(nlp_entry, vocab)
+        docs.append((doc, doc.sentences(),
+                     vocab.select(stopwords)))
+    for lemma in (0, 1):
+        for doc, sentences, stopwords in docs:
+            legacy = legacy_make_candidate_kw(sentences, stopwords,
+                                              lemma, poslist)
+            table = make_candidates(doc, stopwords, lemma, postable)
+            if legacy != table:
+                sys.exit("Chunker output differs from legacy loop!")
+    numtokens = sum(len(doc) for doc, _, _ in docs)
+    timings = [
+        ('legacy', lambda: [legacy_make_candidate_kw(sentences, stopwords,
+                                                     0, poslist)
+                            for _, sentences, stopwords in docs]),
+        ('table', lambda: [make_candidates(doc, stopwords, 0, postable)
+                           for doc, _, stopwords in docs])]
+    for name, func in timings:
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        sys.stdout.write('{0}\t{1:.4f}s\t{2:.0f} tokens/s\n'.format(
+            name, best, numtokens / best))
+
+
+def legacy_neighbours(pdict, sent_dict, ph_token, ph_index, allowed,
+                      testing, lower, threshold=2, gap=1):
+    """ (dict, array, dict, dict, set, int, function, int, int) -> dict
+
+    The neighbours loop before the one pass version (without debug
+    printing).
+    """
+
+    neighbours = {}
+    complex_phrases = {}
+    for phrase in pdict:
+        for index in ph_token[phrase]:
+            if index + 1 >= len(ph_index):
+                continue
+            if ph_index[index+1][0] in pdict:
+                diff = ph_index[index+1][1] - ph_index[index][2]
+                if diff <= gap + 1 and diff > 1:
+                    inter = tuple([lower(sent_dict[i]) for i
+                                   in range(ph_index[index][2]+1,
+                                            ph_index[index+1][1])])
+                    if check_inter(inter, allowed, testing):
+                        unit = (phrase,
+                                ph_index[index+1][0],
+                                inter)
+                        neighbours[unit] = neighbours.get(unit, 0) + 1
+    for nb in neighbours:
+        if neighbours[nb] >= threshold:
+            ckw = tuple(itertools.chain.from_iterable((nb[0],
+                                                       nb[2],
+                                                       nb[1])))
+            complex_phrases[ckw] = combine_scores(neighbours[nb],
+                                                  pdict[nb[0]],
+                                                  pdict[nb[1]])
+    return complex_phrases
+
+
+def bench_neighbours(entries, poslist, repeat, maxgap):
+    """ (list, list, int, int) -> None
+
+    Compare and time the legacy and the one pass neighbours for gaps from
+    1 to maxgap.
+    """
+
+    kwextractor = extractor.KeywordExtractor(
+        extractor.ExtractorConfig(poslist=poslist))
+    config = kwextractor.config
+    docs = []
+    for nlp_entry in entries:
+        vocab = Vocabulary()
+        doc = make_document(nlp_entry, vocab)
+        phrase_list, phrase_by_token, phrase_by_index = make_candidates(
+            doc, vocab.select(kwextractor.stopwords), config.lemma,
+            kwextractor.postable)
+        wordscores = extractor.rake_word_scores(phrase_list, vocab)
+        docs.append((extractor.rake_phrase_scores(phrase_list, wordscores),
+                     doc.words, phrase_by_token, phrase_by_index,
+                     set([vocab.intern(word) for word in config.allowed]),
+                     vocab.lower))
+    numtokens = sum(len(doc[1]) for doc in docs)
+    for gap in xrange(1, maxgap + 1):
+        for pdict, words, ph_token, ph_index, allowed, lower in docs:
+            for testing in (0, 1):
+                legacy = legacy_neighbours(pdict, words, ph_token, ph_index,
+                                           allowed, testing, lower,
+                                           config.threshold, gap)
+                onepass = neighbours(pdict, words, ph_index, allowed,
+                                     testing, lower, config.threshold, gap)
+                if legacy != onepass:
+                    sys.exit("Neighbours output differs from legacy loop!")
+        timings = [
+            ('legacy', lambda: [legacy_neighbours(
+                pdict, words, ph_token, ph_index, allowed, 1, lower,
+                config.threshold, gap)
+                for pdict, words, ph_token, ph_index, allowed, lower
+                in docs]),
+            ('onepass', lambda: [neighbours(
+                pdict, words, ph_index, allowed, 1, lower,
+                config.threshold, gap)
+                for pdict, words, _, ph_index, allowed, lower in docs])]
+        for name, func in timings:
+            best = min(timeit.repeat(func, number=1, repeat=repeat))
+            sys.stdout.write('gap {0}\t{1}\t{2:.4f}s\t{3:.0f} '
+                             'tokens/s\n'.format(gap, name, best,
+                                                 numtokens / best))
+
+
+def legacy_compute_textrank(phrase_list, window, ratio, damping,
+                            max_iterations, tolerance):
+    """(list, int, int, float, int, float) -> dict
+
+    Return a dict of KWs with textrank scores, computed by pygraph as
+    before (phrases are lists of words).
+    """
+
+    from pygraph.classes.digraph import digraph
+    from pygraph.algorithms.pagerank import pagerank
+    text = list(itertools.chain.from_iterable(phrase_list))
+    gr = digraph()
+    gr.add_nodes(unique(text))
+    for i in xrange(len(text) - 1):
+        for word in text[i + 1:i + window]:
+            if not gr.has_edge((text[i], word)):
+                gr.add_edge((text[i], word))
+    prdict = pagerank(gr, damping, max_iterations, tolerance)
+    prlist = [(key, prdict[key]) for key in sorted(prdict, key=prdict.get,
+                                                   reverse=True)]
+    return post_textrank(dict(prlist[:len(text) / ratio]), phrase_list)
+
+
+def bench_textrank(entries, poslist, repeat):
+    """ (list, list, int) -> None
+
+    Compare and time the legacy (pygraph) and the array based TextRank.
+    """
+
+    try:
+        import pygraph
+    except ImportError:
+        sys.exit("The textrank benchmark needs pygraph!")
+    kwextractor = extractor.KeywordExtractor(
+        extractor.ExtractorConfig(poslist=poslist))
+    config = kwextractor.config
+    params = (config.damping, config.maxiter, config.tolerance)
+    for lemma in (0, 1):
+        docs = []
+        for nlp_entry in entries:
+            vocab = Vocabulary()
+            doc = make_document(nlp_entry, vocab)
+            phrase_list = make_candidates(
+                doc, vocab.select(kwextractor.stopwords), lemma,
+                kwextractor.postable)[0]
+            docs.append((phrase_list, vocab,
+                         [[vocab.words[word] for word in phrase]
+                          for phrase in phrase_list]))
+        for phrase_list, vocab, word_list in docs:
+            legacy = legacy_compute_textrank(word_list, config.window,
+                                             config.ratio, *params)
+            textranked = extractor.compute_textrank(
+                phrase_list, config.window, lemma, config.ratio, *params,
+                vocab=vocab)
+            if legacy != vocab.decode(textranked):
+                sys.exit("TextRank output differs from pygraph!")
+    numtokens = sum(len(word) for _, _, word_list in docs
+                    for word in word_list)
+    timings = [
+        ('pygraph', lambda: [legacy_compute_textrank(
+            word_list, config.window, config.ratio, *params)
+            for _, _, word_list in docs]),
+        ('array', lambda: [extractor.compute_textrank(
+            phrase_list, config.window, lemma, config.ratio, *params,
+            vocab=vocab) for phrase_list, vocab, _ in docs])]
+    for name, func in timings:
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        sys.stdout.write('{0}\t{1:.4f}s\t{2:.0f} candidate '
+                         'tokens/s\n'.format(name, best, numtokens / best))
+
+
+STAGES = ('get_sentences_from_entry', 'make_candidate_kw',
+          'rake_word_scores', 'rake_phrase_scores', 'neighbours',
+          'compute_textrank', 'merge_dict', 'postfilter', 'topranked')
+
+
+def make_corpus(entries, numdocs, length, spread, vocabsize, seed):
+    """ (list, int, int, float, int, int) -> list
+
+    Return numdocs synthetic nlp entries made from the sentences of
+    entries. Document lengths (in tokens) have a lognormal distribution
+    with median length and sigma spread, noun and adjective tokens get
+    one of vocabsize synthetic variants with Zipf like frequencies.
+    """
+
+    rand = random.Random(seed)
+    templates = [sentence['tokens'] for nlp_entry in entries
+                 for sentence in nlp_entry['sentences']
+                 if sentence['tokens']]
+    by_pos = collections.defaultdict(list)
+    for tokens in templates:
+        for token in tokens:
+            by_pos[token['POS']].append(token)
+    corpus = []
+    for _ in xrange(numdocs):
+        doclength = max(1, int(rand.lognormvariate(math.log(length),
+                                                   spread)))
+        sentences = []
+        while doclength > 0:
+            template = rand.choice(templates)[:doclength]
+            doclength -= len(template)
+            tokens = []
+            for slot in template:
+                token = rand.choice(by_pos[slot['POS']])
+                word, lemma = token['word'], token['lemma']
+                if slot['POS'][0] in 'NJ' and rand.random() < 0.5:
+                    variant = int(rand.paretovariate(1.0)) % vocabsize
+                    word = u'{0}{1}'.format(word, variant)
+                    lemma = u'{0}{1}'.format(lemma, variant)
+                tokens.append({'word': word, 'lemma': lemma,
+                               'POS': slot['POS']})
+            sentences.append({'tokens': tokens})
+        corpus.append({'sentences': sentences})
+    return corpus
+
+
+def run_stages(kwextractor, nlp_entries):
+    """ (KeywordExtractor, list) -> dict
+
+    Return the dict of the time spent in each stage of the extraction of
+    the entries (see KeywordExtractor.extract_batch, TextRank is computed
+    entry by entry).
+    """
+
+    config = kwextractor.config
+    clock = timeit.default_timer
+    times = collections.OrderedDict([(stage, 0.0) for stage in STAGES])
+    for nlp_entry in nlp_entries:
+        vocab = extractor.Vocabulary()
+        start = clock()
+        doc, numtokens = extractor.get_sentences_from_entry(nlp_entry,
+                                                            vocab)
+        times['get_sentences_from_entry'] += clock() - start
+        if numtokens < config.textlength:
+            continue
+        start = clock()
+        stopwords = vocab.select(kwextractor.stopwords)
+        phrase_list, _, phrase_by_index = \
+            extractor.make_candidate_kw(doc, stopwords, config.lemma,
+                                        config.poslist)
+        numwords = sum([len(phrase) for phrase in phrase_list])
+        times['make_candidate_kw'] += clock() - start
+        start = clock()
+        tokens, phrase_ids = rake.flatten(phrase_list)
+        wordscores = rake.word_scores(tokens, phrase_ids, vocab)
+        times['rake_word_scores'] += clock() - start
+        start = clock()
+        rake_candidates = rake.phrase_scores(phrase_list, tokens, phrase_ids,
+                                             wordscores)
+        times['rake_phrase_scores'] += clock() - start
+        start = clock()
+        rake_candidates.update(neighbours(
+            rake_candidates, doc.words, phrase_by_index,
+            set([vocab.intern(word) for word in config.allowed]),
+            config.testing, vocab.lower, threshold=config.threshold,
+            gap=config.gap))
+        times['neighbours'] += clock() - start
+        start = clock()
+        textrank_kw = extractor.compute_textrank(
+            phrase_list, config.window, config.lemma, config.ratio,
+            config.damping, config.maxiter, config.tolerance, vocab=vocab)
+        times['compute_textrank'] += clock() - start
+        start = clock()
+        merged = merge_dict(rake_candidates, textrank_kw)
+        times['merge_dict'] += clock() - start
+        start = clock()
+        postmerged = extractor.postfilter(merged, kwextractor.postwords,
+                                          kwextractor.patterns,
+                                          config.maxmember, vocab)
+        times['postfilter'] += clock() - start
+        start = clock()
+        topranked(postmerged, numwords, config.kwlimit, config.toprank)
+        times['topranked'] += clock() - start
+    return times
+
+
+def bench_stages(nlp_entries, poslist, repeat):
+    """ (list, list, int) -> dict
+
+    Time the stages of the extraction (best of repeat runs) and return
+    the result (stage times, tokens, peak memory).
+    """
+
+    kwextractor = extractor.KeywordExtractor(
+        extractor.ExtractorConfig(poslist=poslist))
+    runs = [run_stages(kwextractor, nlp_entries) for _ in xrange(repeat)]
+    numtokens = sum([len(sentence['tokens']) for nlp_entry in nlp_entries
+                     for sentence in nlp_entry['sentences']])
+    return {'docs': len(nlp_entries),
+            'tokens': numtokens,
+            'stages': collections.OrderedDict(
+                [(stage, min([run[stage] for run in runs]))
+                 for stage in STAGES]),
+            # kilobytes on linux
+            'maxrss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def stage_report(result, baseline=None, tolerance=0.1):
+    """ (dict, dict, float) -> str, bool
+
+    Return the report of the stage timings (compared with the baseline
+    if given, timings normalized by the number of tokens), and True if
+    any stage is slower than the baseline by more than tolerance.
+    """
+
+    lines = ['{0} docs\t{1} tokens\tpeak RSS {2} kB'.format(
+        result['docs'], result['tokens'], result['maxrss'])]
+    regression = False
+    total = sum(result['stages'].values())
+    stages = result['stages'].items() + [('total', total)]
+    for stage, seconds in stages:
+        line = '{0:<26}{1:9.4f}s {2:6.1%}'.format(stage, seconds,
+                                                  seconds / total)
+        if baseline:
+            if stage == 'total':
+                base = sum(baseline['stages'].values())
+            else:
+                base = baseline['stages'].get(stage)
+            if base:
+                ratio = (seconds / result['tokens']) / \
+                    (base / baseline['tokens'])
+                line += '{0:9.2f}x'.format(ratio)
+                if ratio > 1 + tolerance:
+                    line += '  REGRESSION'
+                    regression = True
+        lines.append(line)
+    if baseline:
+        lines.append('baseline: {0} docs\t{1} tokens\tpeak RSS {2} kB'.format(
+            baseline['docs'], baseline['tokens'], baseline['maxrss']))
+    return '\n'.join(lines) + '\n', regression
+
+
+def start_server(address):
+    """ (str) -> Popen
+
+    Start kwserver.py listening on address and return its process once it
+    accepts connections.
+    """
+
+    server = subprocess.Popen([sys.executable, os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'kwserver.py'),
+        '--listen', address])
+    deadline = time.time() + 60
+    while True:
+        connection = kwserver.connect(address)
+        try:
+            kwserver.call(connection, 'GET', '/stats')
+            return server
+        except socket.error:
+            if server.poll() is not None or time.time() > deadline:
+                server.kill()
+                raise RuntimeError('Server did not start')
+            time.sleep(0.1)
+        finally:
+            connection.close()
+
+
+def bench_server(entries, address, clients, size):
+    """ (list, str, int, int) -> None
+
+    Send the entries to the server at address (one started if None) from
+    clients threads in requests of size entries and report the throughput
+    and latencies.
+    """
+
+    tmpdir = server = None
+    if address is None:
+        tmpdir = tempfile.mkdtemp()
+        address = os.path.join(tmpdir, 'kw.sock')
+        server = start_server(address)
+    requests = [entries[i:i + size] for i in xrange(0, len(entries), size)]
+    # request indexes taken by the clients (next is atomic)
+    indexes = itertools.count()
+    latencies = []
+    rejected = []
+
+    def client():
+        connection = kwserver.connect(address)
+        for index in iter(indexes.next, None):
+            if index >= len(requests):
+                break
+            while True:
+                start = timeit.default_timer()
+                status, response = kwserver.call(connection, 'POST',
+                                                 '/extract', requests[index])
+                if status != 503:
+                    break
+                # backpressure: retry a bit later
+                rejected.append(index)
+                time.sleep(0.01)
+            if status != 200:
+                raise RuntimeError('Request failed: {0}'.format(response))
+            latencies.append(timeit.default_timer() - start)
+        connection.close()
+
+    try:
+        threads = [threading.Thread(target=client) for _ in xrange(clients)]
+        start = timeit.default_timer()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = timeit.default_timer() - start
+        connection = kwserver.connect(address)
+        _, stats = kwserver.call(connection, 'GET', '/stats')
+        connection.close()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            shutil.rmtree(tmpdir)
+    latencies.sort()
+    print '{0} requests\t{1} entries\t{2} clients\t{3:.3f}s'.format(
+        len(latencies), len(entries), clients, elapsed)
+    print '{0:.1f} requests/s\t{1:.1f} entries/s\t{2} rejected'.format(
+        len(latencies) / elapsed, len(entries) / elapsed, len(rejected))
+    print 'client latency p50 {0:.4f}s\tp99 {1:.4f}s'.format(
+        kwserver.percentile(latencies, 0.5),
+        kwserver.percentile(latencies, 0.99))
+    print 'server latency p50 {0:.4f}s\tp99 {1:.4f}s\t{2:.1f} ' \
+        'requests/batch'.format(stats['p50'], stats['p99'],
+                                float(stats['batched']) /
+                                max(stats['batches'], 1))
+
+
+def main():
+    """
+    Run the selected benchmark.
+    """
+
+    with open(args.input) as infile:
+        entries = [entry['description_text_nlp'] for
+                   entry in json.load(infile)]
+    if args.docs:
+        entries = make_corpus(entries, args.docs, args.length, args.spread,
+                              args.vocab, args.seed)
+    if args.bench == 'chunker':
+        bench_chunker(entries, args.pos.split(','), args.repeat)
+    elif args.bench == 'neighbours':
+        bench_neighbours(entries, args.pos.split(','), args.repeat, args.gap)
+    elif args.bench == 'textrank':
+        bench_textrank(entries, args.pos.split(','), args.repeat)
+    elif args.bench == 'server':
+        bench_server(entries, args.address, args.clients, args.size)
+    elif args.bench == 'corpus':
+        json.dump([{'description_text_nlp': nlp_entry} for
+                   nlp_entry in entries], sys.stdout)
+    elif args.bench == 'stages':
+        result = bench_stages(entries, args.pos.split(','), args.repeat)
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as infile:
+                baseline = json.load(infile)
+        report, regression = stage_report(result, baseline, args.tolerance)
+        sys.stdout.write(report)
+        if args.save:
+            with open(args.save, 'w') as outfile:
+                json.dump(result, outfile, indent=4)
+        if regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# coding: utf-8
+"""
+Table driven candidate phrase chunker for KW extraction.
+
+The POS regexps of the configuration are evaluated once for the (finite)
+Penn Treebank tag set giving a table of tag flags, and candidate phrases are
+cut out of sentence fragments by a small state machine running over these
+flags in one pass (see make_candidates).
+
+@Author: oraveczcsaba
+"""
+
+import re
+import collections
+from document import PENN_TAGS, tagset
+
+# tag flags
+ALLOWED = 1
+NOUN = 2
+ADJ = 4
+
+
+class PosTable(dict):
+    """
+    Dict of POS tags with their flags. Tags missing from the Penn tag set
+    are classified (and stored) at first lookup.
+    """
+
+    def __init__(self, poslist):
+        dict.__init__(self)
+        self.patterns = [re.compile(fpos) for fpos in poslist]
+        for tag in PENN_TAGS:
+            self[tag] = self.classify(tag)
+
+    def __missing__(self, pos):
+        flags = self[pos] = self.classify(pos)
+        return flags
+
+    def classify(self, pos):
+        """ (str) -> int
+
+        Return the flags of pos. Every tag is allowed if there are no
+        patterns at all.
+        """
+
+        flags = 0
+        if not self.patterns or \
+                [fpos for fpos in self.patterns if fpos.match(pos)]:
+            flags |= ALLOWED
+        if pos[0] == 'N':
+            flags |= NOUN
+        elif pos[0] == 'J':
+            flags |= ADJ
+        return flags
+
+    def flags_of(self, tags):
+        """ (Vocabulary) -> list
+
+        Return the list of flags of the tags indexed by tag id.
+        """
+
+        return [self[tag] for tag in tags.words]
+
+
+def make_candidates(doc, stopwords, lemma, postable):
+    """(Document, set, int, PosTable) -> list, dict, dict
+
+    Return the candidate phrase list and its indexes (see
+    make_candidate_kw in extract_kw.py).
+    A phrase is a maximal run of allowed non stopword tokens. An adjective
+    directly following a noun closes the running phrase and starts a new
+    one (even if adjectives are not allowed otherwise).
+    """
+
+    phrase_list = []
+    phrase_count = 0
+    phrase_by_token = collections.defaultdict(lambda: [])
+    phrase_by_index = collections.defaultdict(lambda: [])
+    tokens = doc.lemmas if lemma else doc.words
+    tags = doc.tags
+    tagflags = postable.flags_of(tagset)
+    for start, end in doc.fragments():
+        prevnoun = 0
+        phrase = []
+        firstindex = 0
+        for word_index in xrange(start, end):
+            flags = tagflags[tags[word_index]]
+            word = tokens[word_index]
+            if not phrase:
+                firstindex = word_index
+            adjskip = prevnoun and flags & ADJ
+            prevnoun = flags & NOUN
+            if word in stopwords:
+                adjskip = 0
+            elif flags & ALLOWED and not adjskip:
+                phrase.append(word)
+                continue
+            # boundary of phrase so set back indexes
+            word_index -= 1
+            if phrase:
+                key = tuple(phrase)
+                phrase_list.append(phrase)
+                phrase_by_token[key].append(phrase_count)
+                phrase_by_index[phrase_count] = (key, firstindex, word_index)
+                phrase_count += 1
+                phrase = []
+            # the adjective skipped is the first member of next phrase
+            if adjskip:
+                firstindex = word_index + 1
+                phrase.append(word)
+        # add last member in sentence
+        if phrase:
+            key = tuple(phrase)
+            phrase_list.append(phrase)
+            phrase_by_token[key].append(phrase_count)
+            phrase_by_index[phrase_count] = (key, firstindex, word_index)
+            phrase_count += 1
+    return phrase_list, phrase_by_token, phrase_by_index
@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Corpus document frequency table of KW candidates, for IDF re-ranking.
+
+A streaming pass over a corpus (the inputs of extract_kw.py) counts in
+how many entries each candidate keyword (the keys merged from RAKE and
+TextRank) and each of their words occurs, and writes the counts to a
+compact binary table (.kwd file): a header with the number of entries,
+then either
+
+- exact counts: the sorted 64 bit hashes of the lowercased candidates and
+  their counts as parallel arrays, or
+- a count-min sketch (--width, --depth): depth rows of width counters
+  indexed by the hash, with memory bounded by width * depth * 4 bytes
+  whatever the size of the corpus; counts may be overestimated by
+  collisions, never underestimated.
+
+The table is memory mapped and looked up by numpy for all the keywords of
+an entry at once (a binary search or depth gathers), so the IDF costs one
+hash per keyword in the extraction. With a table (extract_kw.py --idf
+FILE or the dftable argument of KeywordExtractor) the IDF rank of the
+keywords is added to the merged RAKE and TextRank ranks (see
+kw_helpers.add_ranks), so generic words of the domain sink without being
+listed in postlist.txt.
+
+Usage: dftable.py [-a] [--width W --depth D] -o table.kwd corpus.json
+
+@Author: oraveczcsaba
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import argparse
+import collections
+import numpy as np
+from kw_helpers import chunked
+from extractor import ExtractorConfig, KeywordExtractor
+from readers import iter_json_array
+from streams import InputStream
+
+MAGIC = 'KWDFTAB1'
+# magic, sha1 of the counts, entries counted, keys (exact table), width
+# and depth (sketch, 0 for an exact table)
+HEADER = struct.Struct('<8s20sQQII')
+HASH = struct.Struct('<Q')
+
+
+def df_key(tokens):
+    """ (tuple) -> str
+
+    Return the table key of a keyword given by its (utf-8) tokens.
+    """
+
+    return ' '.join(tokens).decode('utf-8').lower().encode('utf-8')
+
+
+def key_hashes(keys):
+    """ (list) -> array
+
+    Return the 64 bit hashes of the table keys.
+    """
+
+    unpack = HASH.unpack_from
+    md5 = hashlib.md5
+    return np.array([unpack(md5(key).digest())[0] for key in keys],
+                    dtype=np.uint64)
+
+
+def sketch_columns(hashes, width, depth):
+    """ (array, int, int) -> array
+
+    Return the (depth, len(hashes)) array of the sketch columns of the
+    hashes, by double hashing of their two halves.
+    """
+
+    low = hashes & np.uint64(0xffffffff)
+    high = (hashes >> np.uint64(32)) | np.uint64(1)
+    rows = np.arange(depth, dtype=np.uint64)[:, np.newaxis]
+    return ((low + rows * high) % np.uint64(width)).astype(np.intp)
+
+
+def entry_keys(kwdicts, vocab):
+    """ (list, Vocabulary) -> set
+
+    Return the table keys of the candidates of an entry (the keys of the
+    dicts, tuples of token ids of vocab) and of their words.
+    """
+
+    words = vocab.words
+    candidates = set()
+    for kwdict in kwdicts:
+        candidates.update(kwdict)
+    keys = set([df_key([words[word] for word in kw]) for kw in candidates])
+    keys.update([df_key((words[word],)) for kw in candidates for
+                 word in kw if len(kw) > 1])
+    return keys
+
+
+class DFCounter(object):
+    """
+    Document frequency counter of table keys, exact or by a count-min
+    sketch of width * depth counters.
+    """
+
+    def __init__(self, width=0, depth=4):
+        self.width = width
+        self.depth = depth if width else 0
+        self.docs = 0
+        if width:
+            self.sketch = np.zeros((depth, width), dtype=np.uint32)
+            self.rows = np.arange(depth)[:, np.newaxis]
+        else:
+            self.counts = collections.Counter()
+
+    def add(self, keys):
+        """ (set) -> None
+
+        Count an entry with the (distinct) keys.
+        """
+
+        self.docs += 1
+        if not keys:
+            return
+        hashes = key_hashes(keys)
+        if self.width:
+            # the columns of a row can collide, add.at counts each
+            np.add.at(self.sketch, (self.rows, sketch_columns(
+                hashes, self.width, self.depth)), 1)
+        else:
+            self.counts.update(hashes.tolist())
+
+    def add_results(self, results):
+        """ (list) -> None
+
+        Count the entries of the results of KeywordExtractor.extract_batch
+        (entries under text length limit are counted without keys).
+        """
+
+        for result in results:
+            if result is None:
+                self.add(())
+            else:
+                rake_candidates, textrank_kw, _, vocab = result
+                self.add(entry_keys((rake_candidates, textrank_kw), vocab))
+
+    def dumps(self):
+        """ () -> str
+
+        Return the table (file content) of the counts.
+        """
+
+        if self.width:
+            body = self.sketch.tobytes()
+            size = 0
+        else:
+            hashes = np.array(sorted(self.counts), dtype=np.uint64)
+            counts = np.array([self.counts[key] for key in hashes.tolist()],
+                              dtype=np.uint32)
+            body = hashes.tobytes() + counts.tobytes()
+            size = len(hashes)
+        return HEADER.pack(MAGIC, hashlib.sha1(body).digest(), self.docs,
+                           size, self.width, self.depth) + body
+
+    def write(self, filename):
+        """ (str) -> None
+
+        Write the table to filename, replacing it at once (extractors
+        reloading it never see a half written table).
+        """
+
+        tmpname = '{0}.{1}.tmp'.format(filename, os.getpid())
+        try:
+            with open(tmpname, 'wb') as out:
+                out.write(self.dumps())
+            os.rename(tmpname, filename)
+        except (IOError, OSError):
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
+            raise
+
+
+class DFTable(object):
+    """
+    Document frequency table (mapped file or string, see DFCounter).
+    """
+
+    def __init__(self, data):
+        self.data = data
+        magic, digest, self.docs, self.size, self.width, self.depth = \
+            HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('Not a document frequency table')
+        # identity of the table for the extractor digest
+        self.digest = digest.encode('hex')
+        if self.width:
+            self.sketch = np.frombuffer(
+                data, np.uint32, self.width * self.depth,
+                HEADER.size).reshape(self.depth, self.width)
+            self.rows = np.arange(self.depth)[:, np.newaxis]
+        else:
+            self.hashes = np.frombuffer(data, np.uint64, self.size,
+                                        HEADER.size)
+            self.counts = np.frombuffer(data, np.uint32, self.size,
+                                        HEADER.size + 8 * self.size)
+
+    @classmethod
+    def open(cls, filename):
+        """ (str) -> DFTable
+
+        Return the table of a file, mapped read only.
+        """
+
+        with open(filename, 'rb') as infile:
+            return cls(mmap.mmap(infile.fileno(), 0,
+                                 access=mmap.ACCESS_READ))
+
+    def frequencies(self, keys):
+        """ (list) -> array
+
+        Return the document frequencies of the table keys.
+        """
+
+        hashes = key_hashes(keys)
+        if self.width:
+            return self.sketch[self.rows, sketch_columns(
+                hashes, self.width, self.depth)].min(axis=0)
+        if not self.size:
+            return np.zeros(len(hashes), dtype=np.uint32)
+        index = np.searchsorted(self.hashes, hashes)
+        index[index == self.size] = 0
+        return np.where(self.hashes[index] == hashes, self.counts[index], 0)
+
+    def idf(self, keywords):
+        """ (list) -> array
+
+        Return the (smoothed) inverse document frequencies of the keywords
+        given by their tokens: log((1 + N) / (1 + df)).
+        """
+
+        frequencies = self.frequencies([df_key(kw) for kw in keywords])
+        return np.log((1.0 + self.docs) / (1.0 + frequencies))
+
+
+def parse_args(argv=None):
+    """ (list) -> Namespace
+
+    Return the parsed command line.
+    """
+
+    ap = argparse.ArgumentParser(
+        description="""
+        Count the document frequency of the KW candidates of a corpus.
+        """)
+    ap.add_argument('-a', '--spark', action="count",
+                    help='json lines input (see extract_kw.py -a)')
+    ap.add_argument('-o', '--output', action='store', dest='output',
+                    type=str, required=True,
+                    help='table file to write')
+    ap.add_argument('--width', action='store', dest='width', type=int,
+                    default=0,
+                    help='counters per row of a count-min sketch (default: '
+                    'exact counts)')
+    ap.add_argument('--depth', action='store', dest='depth', type=int,
+                    default=4,
+                    help='rows of the count-min sketch')
+    ap.add_argument('-l', '--lemma', action="count",
+                    help='use lemmas instead of wordforms')
+    ap.add_argument('-p', action='store', dest='pos', type=str,
+                    help='(comma separated list of) pos regexps to include')
+    ap.add_argument('--version', action='version', version='%(prog)s 0.1')
+    ap.add_argument('input', nargs='?', help='input json or stdin (gzip, '
+                    'bzip2 or xz compressed input is decompressed)',
+                    default=sys.stdin)
+    args = ap.parse_args(argv)
+    if args.width < 0 or args.depth < 1:
+        ap.error('--width and --depth must be positive')
+    return args
+
+
+def main(argv=None):
+    """
+    Count the corpus and write the table.
+    """
+
+    args = parse_args(argv)
+    extractor = KeywordExtractor(ExtractorConfig(
+        poslist=args.pos.split(',') if args.pos else None,
+        lemma=1 if args.lemma else None))
+    counter = DFCounter(args.width, args.depth)
+    infile = InputStream(args.input)
+    if args.spark:
+        entries = (entry['description_text_nlp'] for _, entry in
+                   (json.loads(line) for line in infile if line.strip())
+                   if 'description_text_nlp' in entry)
+    else:
+        entries = (entry['description_text_nlp'] for
+                   entry in iter_json_array(infile))
+    for batch in chunked(entries, extractor.config.batchsize):
+        counter.add_results(extractor.extract_batch(batch))
+    infile.close()
+    counter.write(args.output)
+    sys.stderr.write('Counted {0} entries\n'.format(counter.docs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# coding: utf-8
+"""
+Columnar token storage for KW extraction.
+
+A document (the non-punctuation tokens of an entry) is stored in parallel
+int arrays of word ids, lemma ids (see vocab.py) and POS tag ids, the
+position in the arrays being the text position of the token. Sentence
+fragments (split by punctuation) are given by their boundaries.
+
+@Author: oraveczcsaba
+"""
+
+import threading
+from array import array
+from vocab import Vocabulary
+
+PENN_TAGS = ('CC', 'CD', 'DT', 'EX', 'FW', 'IN', 'JJ', 'JJR', 'JJS', 'LS',
+             'MD', 'NN', 'NNS', 'NNP', 'NNPS', 'PDT', 'POS', 'PRP', 'PRP$',
+             'RB', 'RBR', 'RBS', 'RP', 'SYM', 'TO', 'UH', 'VB', 'VBD', 'VBG',
+             'VBN', 'VBP', 'VBZ', 'WDT', 'WP', 'WP$', 'WRB', 'ADD', 'AFX',
+             'GW', 'HYPH', 'NFP', 'XX')
+
+# POS tags are shared by all documents (new tags are added under lock)
+tagset = Vocabulary()
+for tag in PENN_TAGS:
+    tagset.intern(tag)
+tag_lock = threading.Lock()
+
+
+def tag_id(pos):
+    """ (unicode or str) -> int
+
+    Return the id of POS tag in tagset.
+    """
+
+    token_id = tagset.tokens.get(pos)
+    if token_id is None:
+        with tag_lock:
+            token_id = tagset.intern(pos)
+    return token_id
+
+
+class Document(object):
+    """
+    Parallel arrays of the tokens of an entry.
+    """
+
+    __slots__ = ('words', 'lemmas', 'tags', 'bounds')
+
+    def __init__(self):
+        self.words = array('l')
+        self.lemmas = array('l')
+        self.tags = array('l')
+        # start positions of fragments plus the end of the last one
+        self.bounds = array('l', [0])
+
+    def __len__(self):
+        return len(self.words)
+
+    def fragments(self):
+        """ () -> generator
+
+        Yield the (start, end) text positions of the fragments.
+        """
+
+        bounds = self.bounds
+        for i in xrange(len(bounds) - 1):
+            yield bounds[i], bounds[i + 1]
+
+    def sentences(self):
+        """ () -> list
+
+        Return the list of fragments as lists of
+        (word_id, lemma_id, POS, textposition) tuples.
+        """
+
+        words, lemmas, tags = self.words, self.lemmas, self.tags
+        return [[(words[i], lemmas[i], tagset.words[tags[i]], i) for
+                 i in xrange(start, end)]
+                for start, end in self.fragments()]
+
+
+def make_document(nlp_entry, vocab):
+    """ (dict, Vocabulary) -> Document
+
+    Return the document of the content of a description_text_nlp field.
+    """
+
+    doc = Document()
+    words, lemmas, tags, bounds = doc.words, doc.lemmas, doc.tags, doc.bounds
+    intern = vocab.intern
+    for sentence in nlp_entry['sentences']:
+        for token in sentence['tokens']:
+            pos = token['POS']
+            if pos[:1].isalpha():
+                words.append(intern(token['word']))
+                lemmas.append(intern(token['lemma']))
+                tags.append(tag_id(pos))
+            elif len(words) > bounds[-1]:
+                bounds.append(len(words))
+        # add last chunk at the end of sentence
+        if len(words) > bounds[-1]:
+            bounds.append(len(words))
+    return doc
@@ -29,98 +29,144 @@ TODO:
 @Author: oraveczcsaba
 """
 
+import os
 import sys
 import argparse
 import json
-import re
 import itertools
 import collections
-from kw_helpers import unique, isNumeric, printout, \
-    neighbours, write_out, post_textrank, merge_dict, topranked
-from pygraph.classes.digraph import digraph
-from pygraph.algorithms.pagerank import pagerank
-from pygraph.classes.exceptions import AdditionError
-from pkg_resources import resource_filename
-import ConfigParser
-
-config = ConfigParser.RawConfigParser()
+import errno
+import signal
+import multiprocessing
+import functools
+from cStringIO import StringIO
+from kw_helpers import printout, chunked
+from readers import iter_json_array, nlp_start, count_tokens, decoder, \
+    line_id, ENTRY_END
+from extractor import ExtractorConfig, KeywordExtractor, is_standalone, \
+    compact_kwlist
+from kwcache import KeywordCache
+from metrics import Metrics, MetricsParam, MetricsWriter
+from kwtrace import Tracer
+from reloader import ExtractorReloader, watched_files
+from streams import InputStream, OutputStream, COMPRESSIONS, \
+    detect_compression
+from shards import EntryIndex, parse_shard, shard_lines, map_file
+from resources import load_resources
+from dftable import DFTable
 
 try:
     from pipeline.spark.spark_utils import save_dump
-    config.read(resource_filename("pipeline.projects.kbd", "kw.cfg"))
 except ImportError:
-    config.read(resource_filename(__name__, "kw.cfg"))
-    sys.stderr.write("Carefully, carefully, you have a standalone run!\n")
-
-from constants import stopwords
-from postconstants import postwords
-from patterns import patterns
-
-
-ap = argparse.ArgumentParser(
-    description="""
-    Extract keywords merging the RAKE and TextRank algorithms.
-    """)
-ap.add_argument('-v', '--verbose', action="count",
-                help='verbose output for testing (eg. no intertoken filter)')
-ap.add_argument('-l', '--lemma', action="count",
-                help='use lemmas instead of wordforms')
-ap.add_argument('-a', '--spark', action="count",
-                help='take the spark processing route')
-ap.add_argument('-o', '--oneline', action="count",
-                help='standalone with one line/one json input')
-ap.add_argument('-r', '--rake', action="count",
-                help='return RAKE output (in add. to merged)')
-ap.add_argument('-t', '--textrank', action="count",
-                help='return TextRank output (in add. to merged)')
-ap.add_argument('-p', action='store', dest='pos', type=str,
-                help='(comma separated list of) pos regexps to include')
-ap.add_argument('-n', action='store', dest='window', type=int,
-                help='size of window for TextRank')
-ap.add_argument('-c', action='store', dest='threshold', type=int,
-                help='minimum freq for RAKE complex keywords')
-ap.add_argument('--version', action='version', version='%(prog)s 0.2')
-ap.add_argument('-d', '--debug', action="count")
-ap.add_argument('input', nargs='?', help='input json or stdin',
-                default=sys.stdin)
-args = ap.parse_args()
-
-# set parameters
-window = args.window if args.window else config.getint('General', 'window')
-threshold = args.threshold if args.threshold else config.getint('General',
-                                                                'threshold')
-poslist = args.pos.split(',') if args.pos else \
-    config.get('General', 'poslist').split(',')
-allowed = config.get('General', 'allowed').split(',')
-lemma = 1 if args.lemma else config.getint('General', 'lemma')
-tr_ratio = config.getint('General', 'ratio')
-toprank = config.getint('General', 'toprank')
-kwlimit = config.getint('General', 'kwlimit')
-textlength = config.getint('General', 'textlength')
-maxmember = config.getint('General', 'maxmember')
-testing = 1 if args.verbose else 0
-debug = args.debug
-infile = args.input
-
-if not infile == sys.stdin:
-    infile = open(infile, 'r')
+    pass
 
 job_name = 'kw'
+SPARK_COUNTERS = ('entries', 'skipped', 'short', 'failed')
+# result placeholder of failed entries
+FAILED = ()
+# json encoding of the sidecar output
+SIDECAR_SEPARATORS = (',', ':')
+# the extractor (and the parsed command line in a standalone run) used by
+# the processing functions below, set up by main() or at first use
+extractor = None
+options = None
+# ExtractorReloader replacing the extractor on changes (--reload option)
+reloader = None
+
+
+def get_extractor():
+    """ () -> KeywordExtractor
+
+    Return the module extractor (the current one of the reloader if
+    reloading), building it from kw.cfg if needed.
+    """
 
-
-def process_spark(input_data, dump=False, job_sub_name='tmp'):
-    """ (rdd, str, str) -> rdd
-
-    Return keyword assigned entries.
+    global extractor
+    if reloader is not None:
+        return reloader.current()
+    if extractor is None:
+        extractor = KeywordExtractor(ExtractorConfig())
+    return extractor
+
+
+def process_spark(input_data, dump=False, job_sub_name='tmp',
+                  config=None, counters=None, metrics=False, tracer=None,
+                  stamp=False, sidecar=False, compact=False):
+    """ (rdd, str, str, ExtractorConfig, dict, bool, Tracer, bool, bool,
+         bool) -> rdd
+
+    Return keyword assigned entries, or with sidecar set, only the
+    (id, keywords) tuples of the entries with keywords (see sidecar_unit).
+    The config (kw.cfg by default) and the resources are broadcast and the
+    extractor is built once per partition. If counters dict is given,
+    it is filled with the accumulators counting the entries processed
+    ('entries'), without nlp field ('skipped'), under text length limit
+    ('short') and failing with an error ('failed'). With metrics set, the
+    Metrics of the partitions (see metrics.py) are also collected in the
+    'metrics' accumulator of counters. The entries selected by tracer
+    (if given) are traced to its sink on the executors. With stamp set,
+    the processed entries get a keywords_version field (see
+    KeywordExtractor.version).
     """
 
-    kw = input_data.map(process_spark_entry)
+    context = input_data.context
+    resources = context.broadcast((config or ExtractorConfig(),) +
+                                  load_resources() + (tracer,))
+    accumulators = dict([(name, context.accumulator(0))
+                         for name in SPARK_COUNTERS])
+    if metrics:
+        accumulators['metrics'] = context.accumulator(Metrics(),
+                                                      MetricsParam())
+    if counters is not None:
+        counters.update(accumulators)
+    kw = input_data.mapPartitions(functools.partial(
+        process_spark_partition, resources=resources,
+        counters=accumulators, stamp=stamp, sidecar=sidecar,
+        compact=compact))
     if dump:
         save_dump(kw, job_name, job_sub_name)
 
     return kw
 
 
+def process_spark_partition(entry_units, resources=None, counters=None,
+                            stamp=False, sidecar=False, compact=False):
+    """ (iterable, broadcast, dict, bool, bool, bool) -> generator
+
+    Yield (id, entry) tuples with keyword field processing the input
+    in batches (or with sidecar set, the sidecar tuples of the entries
+    with keywords, see sidecar_unit). Use for processing a partition under
+    spark.
+    The extractor is built from the broadcast (config, stopwords,
+    postwords, patterns, tracer) resources if given (see process_spark).
+    The metrics of each batch are added to the 'metrics' accumulator of
+    counters if there is one. With stamp set, the entries get a
+    keywords_version field.
+    """
+
+    metrics = Metrics() if counters and 'metrics' in counters else None
+    if resources is None:
+        partition_extractor = get_extractor()
+        metrics = None
+    else:
+        config, stopwords, postwords, patterns, tracer = resources.value
+        partition_extractor = KeywordExtractor(config, stopwords,
+                                               postwords, patterns,
+                                               metrics=metrics,
+                                               tracer=tracer)
+    for batch in chunked(entry_units, partition_extractor.config.batchsize):
+        for entry_unit in process_spark_batch(batch, partition_extractor,
+                                              counters, stamp):
+            if not sidecar:
+                yield entry_unit
+            elif 'keywords' in entry_unit[1]:
+                yield sidecar_unit(entry_unit[0], entry_unit[1]['keywords'],
+                                   compact,
+                                   entry_unit[1].get('keywords_version'))
+        if metrics is not None:
+            counters['metrics'].add(metrics.pop())
+
+
 def process_spark_entry(entry_unit):
     """ [list] -> tuple
 
@@ -128,412 +174,527 @@ def process_spark_entry(entry_unit):
     under spark.
     """
 
-    entry_id, entry = entry_unit
-    if 'description_text_nlp' not in entry:
-        return (entry_id, entry)
+    return process_spark_batch([entry_unit])[0]
+
+
+def process_spark_batch(entry_units, batch_extractor=None, counters=None,
+                        stamp=False):
+    """ (list, KeywordExtractor, dict, bool) -> list
+
+    Return a list of (id, entry) tuples with keyword field. The TextRank
+    scores of the entries are computed in one batch.
+    If counters (dict of accumulators, see process_spark) is given, the
+    entries are counted, and entries failing with an error are passed on
+    without keywords instead of raising. With stamp set, the processed
+    entries get the version of the extractor in a keywords_version field.
+    """
+
+    batch_extractor = batch_extractor or get_extractor()
+    metrics = batch_extractor.metrics
+    entry_units = [tuple(entry_unit) for entry_unit in entry_units]
+    nlp_entries = [entry['description_text_nlp'] for _, entry in entry_units
+                   if 'description_text_nlp' in entry]
+    ids = [entry_id for entry_id, entry in entry_units
+           if 'description_text_nlp' in entry]
+    if metrics is not None:
+        metrics.count('skipped', len(entry_units) - len(nlp_entries))
+    if counters is None:
+        kwlists = batch_extractor.extract_kwlists(nlp_entries, ids)
     else:
-        nlp_entry = entry['description_text_nlp']
+        counters['entries'].add(len(entry_units))
+        counters['skipped'].add(len(entry_units) - len(nlp_entries))
+        try:
+            kwlists = batch_extractor.extract_kwlists(nlp_entries, ids)
+        except Exception:
+            # find the culprit(s) entry by entry
+            kwlists = []
+            for nlp_entry, entry_id in zip(nlp_entries, ids):
+                try:
+                    kwlists.extend(batch_extractor.extract_kwlists(
+                        [nlp_entry], [entry_id]))
+                except Exception:
+                    counters['failed'].add(1)
+                    if metrics is not None:
+                        metrics.count('failed')
+                    kwlists.append(FAILED)
+        counters['short'].add(kwlists.count(None))
+    kwlists = iter(kwlists)
+    for entry_id, entry in entry_units:
+        if 'description_text_nlp' not in entry:
+            continue
+        kwlist = next(kwlists)
+        if kwlist is FAILED:
+            continue
         # entry['description_text_nlp'] = "__DELETED__"
-        sentences, sent_index, numtokens = get_sentences_from_entry(nlp_entry)
-        if numtokens < textlength:
-            return (entry_id, entry)
-        phraseList, phrase_by_token, phrase_by_index = make_candidate_kw(
-            sentences,
-            stopwords,
-            lemma,
-            poslist)
-        wordscores = rake_word_scores(phraseList)
-        rake_candidates = rake_phrase_scores(phraseList, wordscores)
-        ckw = neighbours(debug, rake_candidates,
-                         sent_index, phrase_by_token,
-                         phrase_by_index, allowed,
-                         testing,
-                         threshold=threshold)
-        rake_candidates.update(ckw)
-        textrank_kw = compute_textrank(phraseList, window, lemma, tr_ratio)
-        merged = merge_dict(rake_candidates, textrank_kw)
-        postmerged = postfilter(merged, postwords, patterns, maxmember)
-        head = topranked(postmerged, phraseList, kwlimit, toprank)
         # add KW field but only if not empty
-        if head:
-            kwlist = [{" ".join(key): head[key]} for
-                      key in sorted(head, key=head.get)]
+        if kwlist:
             entry['keywords'] = kwlist
-    return (entry_id, entry)
+        if stamp:
+            entry['keywords_version'] = batch_extractor.version
+    return entry_units
 
 
-def process_entries(nlp_entry, stopwords, lemma,
-                    poslist, threshold, tr_ratio,
-                    toprank, textlength):
-    """ (dict, dict, int, list, int, int) -> None
+def sidecar_unit(entry_id, kwlist, compact=False, version=None):
+    """ (object, list, bool, str) -> tuple
+
+    Return the sidecar output of an entry: (id, keyword list), or with
+    compact set, (id, keywords, ranks) with the parallel lists of the
+    keywords and of their ranks. The version is appended if given.
+    """
+
+    unit = (entry_id,) + (compact_kwlist(kwlist) if compact else (kwlist,))
+    return unit + (version,) if version is not None else unit
+
+
+def process_entries(nlp_entry, out=None):
+    """ (dict, file) -> None
 
     Temporary main processor for KW extraction. To be replaced by
     more principled integration into pipeline.
     """
-    # default split of input into fragments, plus text storage
-    sentences, sent_index, numtokens = get_sentences_from_entry(nlp_entry)
-    if numtokens < textlength:
-        print "===>TEXT LENGTH UNDER LIMIT: SKIPPED<==="
-        return False
-    # generate candidate keywords and indexes for postprocessing
-    phraseList, phrase_by_token, phrase_by_index = make_candidate_kw(
-        sentences,
-        stopwords,
-        lemma,
-        poslist)
-    # calculate RAKE word scores
-    wordscores = rake_word_scores(phraseList)
-    # and phrase scores
-    rake_candidates = rake_phrase_scores(phraseList, wordscores)
-    # postprocess RAKE candidates to get more complex phrases
-    ckw = neighbours(debug, rake_candidates,
-                     sent_index, phrase_by_token,
-                     phrase_by_index, allowed,
-                     testing,
-                     threshold=threshold)
-    # merge the above two results
-    rake_candidates.update(ckw)
-    # compute textrank dict
-    textrank_kw = compute_textrank(phraseList, window, lemma, tr_ratio)
-    # merge the two rankings into one
-    merged = merge_dict(rake_candidates, textrank_kw)
-    # apply postfilter
-    postmerged = postfilter(merged, postwords, patterns, maxmember)
-    # take the first N elements only (proportional to text length)
-    head = topranked(postmerged, phraseList, kwlimit, toprank)
+
+    print_result(get_extractor().extract_batch([nlp_entry])[0], out)
+
+
+def print_result(result, out=None, version=None):
+    """ (tuple, file, str) -> None
+
+    Print the result of KW extraction for one entry (see
+    KeywordExtractor.extract_batch) to out (stdout by default), with the
+    version of the extractor if given.
+    """
+
+    out = out or sys.stdout
+    if version is not None:
+        print >>out, "VERSION:", version
+    if result is None:
+        print >>out, "===>TEXT LENGTH UNDER LIMIT: SKIPPED<==="
+        return
+    rake_candidates, textrank_kw, head, vocab = result
     # make a simple print for the time being
-    if args.textrank:
-        print "====>TEXTRANK<===="
-        printout(textrank_kw)
-    if args.rake:
-        print "=====>RAKE<====="
-        printout(rake_candidates)
+    if options and options.textrank:
+        print >>out, "====>TEXTRANK<===="
+        printout(vocab.decode(textrank_kw), out=out)
+    if options and options.rake:
+        print >>out, "=====>RAKE<====="
+        printout(vocab.decode(rake_candidates), out=out)
     # print merged
-    print "====>MERGED<===="
-    printout(head, reverse=False)
+    print >>out, "====>MERGED<===="
+    printout(head, reverse=False, out=out)
 
 
 def read_json(file):
-    """ (file) -> list
+    """ (file) -> generator
 
-    Returns a list of json 'description_text_nlp' fields
-    from input file (stdin).
-    To be replaced by a proper entry reader.
+    Yield the json 'description_text_nlp' fields of the entries
+    from input file (stdin) one by one.
+    The input is read incrementally, so memory use does not grow with it.
     """
 
-    nlp_entries = []
-    for entry in json.load(file):
-        nlp_entries.append(entry['description_text_nlp'])
-    return nlp_entries
+    for entry in iter_json_array(file):
+        yield entry['description_text_nlp']
 
 
-def get_sentences_from_entry(nlp_entry):
-    # this is the entry point for this program if integrated
-    # into the pipeline
-    """ (dict) -> list, dict, int
-    Return
-    1. a list of sentence fragments (split by punctuations)
-    from the input dict containing an nlp entry.
-    A sentence fragment is a list of (token, lemma, POS, textposition) tuples.
+def add_fields(line, fields):
+    """ (str, str) -> str
 
-    2. a dict of indexes with (word, lemma, pos) tuples as values.
+    Return a spark mode input line with the json encoded fields appended
+    to its entry.
+    """
 
-    3. the number of non-punctuation tokens in the text (to allow for
-    text length threshold check).
+    end = ENTRY_END.search(line).start()
+    return line[:end] + fields + line[end:]
 
-    Input is the content of the description_text_nlp field.
-    """
 
-    sentences = []
-    sent = []
-    sent_index = {}
-    index = 0
-    for sentence in nlp_entry['sentences']:
-        for token in sentence['tokens']:
-            word = token['word'].encode('utf-8')
-            lemma = token['lemma'].encode('utf-8')
-            pos = str(token['POS'])
-            if str.isalpha(pos[0]):
-                sent.append((word,
-                             lemma,
-                             pos,
-                             index))
-                sent_index[index] = (word,
-                                     lemma,
-                                     pos)
-                index += 1
-            else:
-                if sent:
-                    if debug:
-                        write_out(("ADDING S:", sent))
-                    sentences.append(sent)
-                    sent = []
-        if sent:
-            # add last chunk at the end of sentence
-            if debug:
-                write_out(("ADDING S:", sent))
-            sentences.append(sent)
-            sent = []
-    return sentences, sent_index, index
-
-
-def make_candidate_kw(sentences, stopwords, lemma, poslist):
-    """(list, dict, int, list) -> list, dict, dict
-
-    Return
-    1. a list of list of words as candidate phrases for KWs,
-    2. a dictionary of phrase tuples containing positional indeces,
-    3. a dictionary of positional indexes containing
-    (phrase_tuple, textindex_of_first_word, textindex_of_last_word) tuples.
-    The 2. and 3. dictionaries can be used for postprocessing to rejoin phrases
-    into complex KWs.
-    """
+def spark_lines(lines, sidecar=False, compact=False):
+    """ (list, bool, bool) -> str
 
-    phrase_list = []
-    phrase_count = 0
-    # store phrase indexes for postprocessing KW candidates
-    phrase_by_token = collections.defaultdict(lambda: [])
-    phrase_by_index = collections.defaultdict(lambda: [])
-    for sentence in sentences:
-        prevpos = 'X'
-        phrase = []
-        firstindex = 0
-        for wtuple in sentence:
-            pos = wtuple[2]
-            word = wtuple[lemma]
-            # do not case fold proper nouns
-            if pos != 'NNP':
-                word.lower()
-            word_index = wtuple[3]
-            if debug:
-                write_out(("WORD+INDEX:", word_index, word))
-            firstindex = firstindex if len(phrase) else word_index
-            # filter for pos if needed
-            skip = 1 if poslist else 0
-            adjskip = 1 if (prevpos[0] == 'N' and pos[0] == 'J') else 0
-            prevpos = pos
-            if [pos for fpos in poslist if re.match(fpos, pos)]:
-                skip = 0
-            if word in stopwords or skip or adjskip:
-                # if word is stopword switch off adjskip branch below!
-                if word in stopwords:
-                    adjskip = 0
-                # boundary of phrase so set back indexes unless adjskip
-                word_index = word_index - 1
-                if len(phrase) > 0:
-                    phrase_list.append(phrase)
-                    phrase_by_token[tuple(phrase)].append(phrase_count)
-                    phrase_by_index[phrase_count] = ((tuple(phrase),
-                                                      firstindex,
-                                                      word_index))
-                    if debug:
-                        write_out(("ADDING PHRASE:",
-                                   tuple(phrase),
-                                   phrase_count,
-                                   firstindex,
-                                   word_index))
-                    phrase_count += 1
-                    phrase = []
-                # if adjskip we have to start next phrase and set its
-                # firstindex as this adj can be first member of next phrase
-                if adjskip:
-                    firstindex = word_index + 1
-                    phrase.append(word)
-                    if debug:
-                        print "ADJSKIP:", word, "FIRSTINDEX:", firstindex
-            else:
-                phrase.append(word)
-                if debug:
-                    write_out(("APPEND FIRSTINDEX:",
-                               firstindex, "WORD:",
-                               word, "WORDINDEX:",
-                               word_index))
-        # add last member in sentence
-        if len(phrase) > 0:
-            phrase_list.append(phrase)
-            phrase_by_token[tuple(phrase)].append(phrase_count)
-            phrase_by_index[phrase_count] = ((tuple(phrase),
-                                              firstindex,
-                                              word_index))
-            phrase_count += 1
-            if debug:
-                write_out(("ADDING LAST PHRASE:",
-                           tuple(phrase),
-                           phrase_count,
-                           firstindex, word_index))
-    return phrase_list, phrase_by_token, phrase_by_index
-
-
-def rake_word_scores(phraseList):
-    """(list) -> dict
-
-    Return a dict of words with their RAKE score values.
+    Return the --spark mode output for a chunk of input lines.
+    Only the nlp field of the entries is decoded, the rest of the lines is
+    passed through with the keywords field appended (lines which can not be
+    projected are decoded fully, see readers.nlp_start). Entries under text
+    length limit by a token count are not decoded at all.
+    With sidecar set, only the entries with keywords are output as json
+    encoded sidecar tuples (see sidecar_unit).
     """
 
-    word_freq = {}
-    word_degree = {}
-    for phrase in phraseList:
-        degree = len(filter(lambda x: not isNumeric(x), phrase)) - 1
-        for word in phrase:
-            word_freq[word] = word_freq.get(word, 0) + 1.0
-            word_degree[word] = word_degree.get(word, 0) + float(degree)
-    for word in word_freq:
-        word_degree[word] = word_degree[word] + word_freq[word]  # itself
-    # word score = deg(w) / freq(w)
-    word_score = {}
-    for word in word_freq:
-        word_score[word] = word_degree[word] / word_freq[word]
-        if debug:
-            write_out(("ITEM:", word,
-                       "SCORE:",  word_score[word]))
-    return word_score
-
-
-def compute_textrank(phrase_list, window, lemma, ratio=2):
-    """(list, int, int, int) -> dict
-
-    Return a dict of KWs with textrank scores.
-    Arguments:
-    - phrase_list: list of candidate phrase lists
-    - window: size of cocccurrence window
-    - lemma: 1 if lemmas are used instead of wordforms
-    - ratio: ratio of all KWs included in the top N list
+    batch_extractor = get_extractor()
+    metrics = batch_extractor.metrics
+    textlength = batch_extractor.config.textlength
+    stamp = reloader is not None
+    outputs = []
+    # (output index, line, nlp entry) of projected lines
+    projected = []
+    # (output index, entry unit) of fully decoded lines
+    decoded = []
+    # output indexes of the lines rejected by the token count
+    rejected = []
+    for line in lines:
+        line = line.rstrip()
+        start = nlp_start(line)
+        if start is None:
+            decoded.append((len(outputs), json.loads(line)))
+        elif start and count_tokens(line, start) >= textlength:
+            projected.append((len(outputs), line,
+                              decoder.raw_decode(line, start)[0]))
+        elif start:
+            rejected.append(len(outputs))
+            if metrics is not None:
+                metrics.count('short')
+                metrics.count('entries')
+        elif metrics is not None:
+            # no nlp field
+            metrics.count('skipped')
+        outputs.append(None if sidecar else line)
+    kwlists = batch_extractor.extract_kwlists(
+        [nlp_entry for _, _, nlp_entry in projected],
+        [line_id(line) for _, line, _ in projected]
+        if batch_extractor.tracer is not None else None)
+    version = batch_extractor.version if stamp else None
+    for (index, line, _), kwlist in zip(projected, kwlists):
+        if sidecar:
+            if kwlist:
+                outputs[index] = json.dumps(
+                    sidecar_unit(line_id(line), kwlist, compact, version),
+                    separators=SIDECAR_SEPARATORS)
+            continue
+        # add KW field but only if not empty
+        fields = ''
+        if kwlist:
+            fields = ', "keywords": {0}'.format(json.dumps(kwlist))
+        if stamp:
+            fields += ', "keywords_version": {0}'.format(json.dumps(version))
+        if fields:
+            outputs[index] = add_fields(line, fields)
+    if stamp and not sidecar:
+        # stamped like the short entries decoded fully (see below)
+        for index in rejected:
+            outputs[index] = add_fields(outputs[index], ', "keywords_version"'
+                                        ': {0}'.format(json.dumps(version)))
+    if decoded:
+        entry_units = process_spark_batch([entry_unit for _, entry_unit
+                                           in decoded], batch_extractor,
+                                          stamp=stamp)
+        for (index, _), (entry_id, entry) in zip(decoded, entry_units):
+            if not sidecar:
+                outputs[index] = json.dumps((entry_id, entry))
+            elif 'keywords' in entry:
+                outputs[index] = json.dumps(
+                    sidecar_unit(entry_id, entry['keywords'], compact,
+                                 entry.get('keywords_version')),
+                    separators=SIDECAR_SEPARATORS)
+    return ''.join(['{0}\n'.format(output) for output in outputs
+                    if output is not None])
+
+
+def oneline_lines(lines):
+    """ (list) -> str
+
+    Return the --oneline mode output for a chunk of input lines.
     """
 
-    # flatten out input phrase list to get back text for postprocessing
-    # this is not very optimal
-    text = list(itertools.chain.from_iterable(phrase_list))
-    numwords = len(text)
-    # set up graph
-    gr = digraph()
-    gr.add_nodes(unique(text))
-    if debug:
-        write_out(("TEXT:", text))
-    # add edges for words within window, be careful to add members
-    # for the last shrinking windows at the end of list!
-    i = 0
-    while i < numwords - 1:
-        source = text[i]
-        firstindex = i + 1
-        lastindex = i + window
-        if lastindex > numwords:
-            lastindex = numwords
-        if firstindex > numwords - 1:
-            break
-
-        for w in text[firstindex:lastindex]:
-            if debug:
-                write_out(("EGDE BTW:", source,
-                           "and", w))
-            try:
-                gr.add_edge((source, w))
-            except AdditionError:
-                sys.stderr.write('Already added: {0}\t{1}\n'.format(source, w))
-
-        i += 1
-
-    # calculate pagerank
-    prdict = pagerank(gr)
-    prlist = [(key, prdict[key]) for key in sorted(prdict,
-                                                   key=prdict.get,
-                                                   reverse=True)]
-    # get first number of nodes/ratio elements
-    if debug:
-        write_out(("TR FULL LIST:", prlist))
-    prlist = prlist[:numwords / ratio]
-    if debug:
-        write_out(("TR SHORT LIST:", prlist))
-    # make a dict from the list to facilitate postprocessing
-    prdict = dict(prlist)
-    # postrocess initial result
-    textranked = post_textrank(prdict, phrase_list)
-    return textranked
-
-
-def rake_phrase_scores(phrase_list, word_scores):
-    """(list, dict) -> dict
-
-    Return a dict of phrases with their scores.
+    out = StringIO()
+    entry_units = [(entry_id, entry) for entry_id, entry in
+                   [json.loads(line) for line in lines]
+                   if 'description_text_nlp' in entry]
+    batch_extractor = get_extractor()
+    version = batch_extractor.version if reloader is not None else None
+    results = batch_extractor.extract_batch(
+        [entry['description_text_nlp'] for _, entry in entry_units],
+        [entry_id for entry_id, _ in entry_units])
+    for (_, entry), result in zip(entry_units, results):
+        if 'description' in entry:
+            print >>out, "TEXT:", entry['description'].encode('utf-8')
+        print_result(result, out, version)
+        print >>out, '=' * 24
+    return out.getvalue()
+
+
+def measured(func, chunk):
+    """ (function, list) -> str, Metrics
+
+    Return the output of func for chunk and the metrics recorded by the
+    module extractor meanwhile (to ship them from a worker process).
     """
 
-    phrase_scores = {}
-    for phrase in phrase_list:
-        phrase_score = 0
-        for word in phrase:
-            phrase_score += word_scores[word]
-        phrase_scores[tuple(phrase)] = phrase_score
-    return phrase_scores
+    return func(chunk), get_extractor().metrics.pop()
 
 
-def postfilter(merged, postwords, patterns, maxmember):
-    """(dict, dict, dict, int) -> dict
+def merge_metrics(outputs, metrics):
+    """ (iterable, Metrics) -> generator
 
-    Return a filtered result KW dictionary by stoplist and patterns.
-    Arguments:
-    - merged: input dictionary of KWs
-    - postwords: dict of tokens not allowed as individual KWs
-    - patterns: dict of patterns not allowed in KWs
-    - maxmember: maximum number of tokens allowed in complex KW
+    Yield the outputs of (output, metrics) pairs (see measured) merging
+    their metrics into metrics.
     """
 
-    out = {}
-    for kw in merged:
-        # check if KW matches forbidden pattern
-        kwstring = repr(" ".join(kw))
-        if debug:
-            print "KWSTRING:", kwstring
-        if [kwstring for fp in patterns.keys()if re.search(fp,
-                                                           kwstring,
-                                                           re.U)]:
-            if debug:
-                print "MATCHED:", kwstring
-            continue
-        # check if one token KW is in forbidden list
-        if len(kw) == 1 and kw[0] in postwords:
-            if debug:
-                print "POSTFILTERED:", kw[0]
-            continue
-        # check length limit
-        if len(kw) > maxmember:
-            continue
+    for output, output_metrics in outputs:
+        metrics.merge(output_metrics)
+        yield output
+
+
+def init_worker():
+    """
+    Let the parent process handle keyboard interrupts.
+    """
 
-        out[kw] = merged[kw]
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
 
-    return out
 
+def pool_map(func, chunks, jobs, maxtasks, inflight):
+    """ (function, iterable, int, int, int) -> generator
 
-def main():
+    Yield the results of func applied to chunks in input order, computing
+    them in a pool of jobs worker processes. At most inflight * jobs
+    chunks are queued at a time, and workers are replaced after
+    maxtasks chunks to cap their memory growth.
+    Workers are forked, so they share the module extractor.
+    """
+
+    pool = multiprocessing.Pool(jobs, init_worker, maxtasksperchild=maxtasks)
+    pending = collections.deque()
+    try:
+        for chunk in chunks:
+            pending.append(pool.apply_async(func, (chunk,)))
+            if len(pending) >= inflight * jobs:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+        pool.close()
+    finally:
+        # also on errors or when the consumer stops (eg. broken pipe)
+        pool.terminate()
+        pool.join()
+
+
+def parse_args(argv=None):
+    """ (list) -> Namespace
+
+    Return the parsed command line.
+    """
+
+    ap = argparse.ArgumentParser(
+        description="""
+        Extract keywords merging the RAKE and TextRank algorithms.
+        """)
+    ap.add_argument('-v', '--verbose', action="count",
+                    help='verbose output for testing '
+                    '(eg. no intertoken filter)')
+    ap.add_argument('-l', '--lemma', action="count",
+                    help='use lemmas instead of wordforms')
+    ap.add_argument('-a', '--spark', action="count",
+                    help='take the spark processing route')
+    ap.add_argument('-o', '--oneline', action="count",
+                    help='standalone with one line/one json input')
+    ap.add_argument('--sidecar', action="count",
+                    help='output only [id, keywords] of the entries with '
+                    'keywords (--spark mode)')
+    ap.add_argument('--compact', action="count",
+                    help='output [id, keywords, ranks] with parallel '
+                    'keyword and rank lists (--sidecar mode)')
+    ap.add_argument('-r', '--rake', action="count",
+                    help='return RAKE output (in add. to merged)')
+    ap.add_argument('-t', '--textrank', action="count",
+                    help='return TextRank output (in add. to merged)')
+    ap.add_argument('-p', action='store', dest='pos', type=str,
+                    help='(comma separated list of) pos regexps to include')
+    ap.add_argument('-n', action='store', dest='window', type=int,
+                    help='size of window for TextRank')
+    ap.add_argument('-c', action='store', dest='threshold', type=int,
+                    help='minimum freq for RAKE complex keywords')
+    ap.add_argument('-j', '--jobs', action='store', dest='jobs', type=int,
+                    default=1,
+                    help='number of worker processes '
+                    '(--spark/--oneline modes)')
+    ap.add_argument('--cache', action='store', dest='cache', type=str,
+                    help='keyword cache file (--spark mode)')
+    ap.add_argument('--metrics', action='store', dest='metrics', type=str,
+                    help='file to dump run metrics to periodically (json '
+                    'lines, or OpenMetrics text if it ends with .prom)')
+    ap.add_argument('--reload', action="count",
+                    help='reload kw.cfg and the resource files when they '
+                    'change (checked every reloadinterval seconds) and '
+                    'record the version of the extractor on the outputs')
+    ap.add_argument('--idf', action='store', dest='idf', type=str,
+                    help='document frequency table of the corpus (see '
+                    'dftable.py) to add the IDF rank of the keywords')
+    ap.add_argument('--patstats', action="count",
+                    help='report pattern filter hits and costs to stderr')
+    ap.add_argument('--version', action='version', version='%(prog)s 0.2')
+    ap.add_argument('-d', '--debug', action="count",
+                    help='trace all entries (to stderr by default)')
+    ap.add_argument('--trace', action='store', dest='trace', type=str,
+                    help='file to write the trace events of the selected '
+                    'entries to (json lines, default: stderr)')
+    ap.add_argument('--trace-ids', action='store', dest='trace_ids',
+                    type=str,
+                    help='comma separated list of entry IDs to trace (the '
+                    'entry number in whole file json input)')
+    ap.add_argument('--trace-sample', action='store', dest='trace_sample',
+                    type=float, default=0.0,
+                    help='fraction of the entries to trace')
+    ap.add_argument('--output', action='store', dest='output', type=str,
+                    help='output file (default: stdout), compressed if it '
+                    'ends with .gz, .bz2 or .xz')
+    ap.add_argument('--compress', action='store', dest='compress',
+                    choices=COMPRESSIONS,
+                    help='compress the output')
+    ap.add_argument('--level', action='store', dest='level', type=int,
+                    choices=range(1, 10),
+                    help='compression level of the output (1-9)')
+    ap.add_argument('--shard', action='store', dest='shard', type=str,
+                    help='process only shard K/N (1 <= K <= N) of the '
+                    'input file: the lines starting in the K-th of N byte '
+                    'ranges (line modes)')
+    ap.add_argument('--index', action='store', dest='index', type=str,
+                    help='entry offset index file of the input file, '
+                    '(re)built if needed; without --ids only the index is '
+                    'built')
+    ap.add_argument('--ids', action='store', dest='ids', type=str,
+                    help='comma separated list of entry IDs to process, '
+                    'read by --index (line modes)')
+    ap.add_argument('input', nargs='?', help='input json or stdin (gzip, '
+                    'bzip2 or xz compressed input is decompressed)',
+                    default=sys.stdin)
+    args = ap.parse_args(argv)
+    if args.shard or args.index:
+        if args.input is sys.stdin:
+            ap.error('--shard and --index need an input file')
+        if detect_compression(map_file(args.input)[:6]):
+            ap.error('--shard and --index need uncompressed input')
+    if args.shard:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            ap.error(str(e))
+    if args.ids and not args.index:
+        ap.error('--ids needs --index')
+    if (args.shard or args.ids) and not (args.spark or args.oneline):
+        ap.error('--shard and --ids need a line mode (--spark, --oneline)')
+    if args.sidecar and not args.spark:
+        ap.error('--sidecar needs --spark')
+    if args.compact and not args.sidecar:
+        ap.error('--compact needs --sidecar')
+    return args
+
+
+def main(argv=None):
     """
     Read input and do everything if standalone.
     """
 
-    if args.spark:
-        # one line/json input, similar output
-        for line in infile:
-            entry = json.loads(line)
-            sys.stdout.write('{0}\n'.format(
-                json.dumps(process_spark_entry(entry))))
-    elif args.oneline:
-        # one line/json input, standalone output for testing
-        for line in infile:
-            entry_unit = json.loads(line)
-            entry_id, entry = entry_unit
-            if 'description_text_nlp' not in entry:
-                continue
-            if 'description' in entry:
-                print "TEXT:", entry['description'].encode('utf-8')
-            nlp_entry = entry['description_text_nlp']
-            process_entries(nlp_entry, stopwords, lemma,
-                            poslist, threshold, tr_ratio,
-                            toprank, textlength)
-            print '=' * 24
+    global extractor, options, reloader
+    options = args = parse_args(argv)
+    if args.index:
+        index = EntryIndex(args.index, args.input)
+        count = index.update()
+        if count is not None:
+            sys.stderr.write('Indexed {0} lines\n'.format(count))
+        if not args.ids:
+            return
+    if is_standalone():
+        sys.stderr.write("Carefully, carefully, you have a standalone run!\n")
+    # set parameters: command line overrides kw.cfg
+    overrides = dict(window=args.window or None,
+                     threshold=args.threshold or None,
+                     poslist=args.pos.split(',') if args.pos else None,
+                     lemma=1 if args.lemma else None,
+                     testing=1 if args.verbose else 0)
+    config = ExtractorConfig(**overrides)
+    cache = KeywordCache(args.cache, config.cachesize) if args.cache \
+        else None
+    metrics = Metrics() if args.metrics else None
+    tracer = None
+    if args.debug or args.trace or args.trace_ids or args.trace_sample:
+        tracer = Tracer(args.trace or '-',
+                        args.trace_ids.split(',') if args.trace_ids else None,
+                        1.0 if args.debug else args.trace_sample)
+
+    def make_extractor():
+        # reloaded versions keep the command line overrides
+        return KeywordExtractor(ExtractorConfig(**overrides),
+                                profile=args.patstats, cache=cache,
+                                metrics=metrics, tracer=tracer,
+                                dftable=DFTable.open(args.idf)
+                                if args.idf else None)
+
+    if args.reload:
+        reloader = ExtractorReloader(make_extractor, config.reloadinterval,
+                                     watched_files() + [args.idf]
+                                     if args.idf else None)
+        extractor = reloader.extractor
+    else:
+        extractor = make_extractor()
+    writer = MetricsWriter(args.metrics, metrics, config.metricsinterval) \
+        if metrics is not None else None
+    if cache is not None:
+        cachestats = cache.stats()
+    infile = None
+    if args.shard:
+        lines = shard_lines(args.input, *args.shard)
+    elif args.ids:
+        lines, missing = index.lines(args.ids.decode('utf-8').split(','))
+        if missing:
+            sys.stderr.write(u'Entries not found: {0}\n'.format(
+                ','.join(missing)).encode('utf-8'))
+    else:
+        # decompressed/compressed by child processes if needed
+        lines = infile = InputStream(args.input)
+    out = OutputStream(args.output, args.compress, args.level)
+
+    if args.spark or args.oneline:
+        # one line/json input, similar (spark) or
+        # standalone output for testing (oneline)
+        func = functools.partial(spark_lines, sidecar=bool(args.sidecar),
+                                 compact=bool(args.compact)) \
+            if args.spark else oneline_lines
+        chunks = chunked(lines, config.batchsize)
+        if args.jobs > 1 and metrics is not None:
+            outputs = merge_metrics(pool_map(functools.partial(measured,
+                                                               func),
+                                             chunks, args.jobs,
+                                             config.maxtasks,
+                                             config.inflight), metrics)
+        elif args.jobs > 1:
+            outputs = pool_map(func, chunks, args.jobs, config.maxtasks,
+                               config.inflight)
+        else:
+            outputs = itertools.imap(func, chunks)
+        try:
+            for output in outputs:
+                out.write(output)
+                if writer is not None:
+                    writer.tick()
+            out.flush()
+        except IOError as e:
+            if e.errno != errno.EPIPE:
+                raise
+            # output closed (eg. by head): stop the workers and send what
+            # is left in the stdout buffer to devnull to exit quietly
+            if args.jobs > 1:
+                outputs.close()
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return
+        if cache is not None:
+            sys.stderr.write(cache.report(cachestats))
     else:
         # standalone with all entries in one json file
-        for nlp_entry in read_json(infile):
-            print '=' * 24
-            process_entries(nlp_entry, stopwords, lemma,
-                            poslist, threshold, tr_ratio,
-                            toprank, textlength)
+        for batch in chunked(enumerate(read_json(infile)), config.batchsize):
+            ids, nlp_entries = zip(*batch)
+            batch_extractor = get_extractor()
+            version = batch_extractor.version if args.reload else None
+            for result in batch_extractor.extract_batch(list(nlp_entries),
+                                                        ids):
+                print >>out, '=' * 24
+                print_result(result, out, version)
+            if writer is not None:
+                writer.tick()
+    out.close()
+    if infile is not None:
+        infile.close()
+    if writer is not None:
+        writer.write()
+    if args.patstats:
+        sys.stderr.write(get_extractor().patterns.report())
 
 
 if __name__ == '__main__':
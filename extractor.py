@@ -0,0 +1,584 @@
+# coding: utf-8
+"""
+Library API of KW extraction merging the RAKE and TextRank algorithms
+(see extract_kw.py for the command line tool).
+
+A KeywordExtractor is built from an ExtractorConfig (the parameters of
+kw.cfg plus overrides) and the stopword, postword and pattern resources.
+It holds no state between calls besides its compiled resources, so it can
+be shared by threads. Importing this module has no side effects.
+
+@Author: oraveczcsaba
+"""
+
+import hashlib
+import itertools
+import ConfigParser
+import numpy as np
+from kw_helpers import neighbours, post_textrank, \
+    merge_dict, add_ranks, topranked, chunked
+from textrank import build_graph, pagerank_batch, dict_order
+import rake
+from chunker import PosTable, make_candidates
+from patfilter import PatternFilter
+from vocab import Vocabulary
+from document import make_document
+from kwcache import entry_digest, config_digest
+from metrics import clock
+from resources import resource_path, load_resources
+
+postables = {}
+
+
+def default_config_file():
+    """ () -> str
+
+    Return the path of kw.cfg (in the pipeline package if present).
+    """
+
+    return resource_path("kw.cfg")
+
+
+def is_standalone():
+    """ () -> bool
+
+    Return True if running outside of the pipeline.
+    """
+
+    try:
+        import pipeline.spark.spark_utils
+        return False
+    except ImportError:
+        return True
+
+
+class ExtractorConfig(object):
+    """
+    Parameters of KW extraction. Values are read from the [General]
+    section of a kw.cfg file and can be overridden by keyword arguments
+    (None values are ignored).
+    """
+
+    INTS = ('textlength', 'lemma', 'window', 'batchsize', 'ratio',
+            'toprank', 'kwlimit', 'maxmember', 'patterncache', 'threshold',
+            'gap', 'maxiter', 'maxtasks', 'inflight', 'cachesize',
+            'metricsinterval', 'reloadinterval', 'queuesize', 'batchwait',
+            'requesttimeout')
+    FLOATS = ('damping', 'tolerance')
+    LISTS = ('allowed', 'poslist')
+
+    def __init__(self, filename=None, **overrides):
+        parser = ConfigParser.RawConfigParser()
+        parser.read(filename or default_config_file())
+        for name in self.INTS:
+            setattr(self, name, parser.getint('General', name))
+        for name in self.FLOATS:
+            setattr(self, name, parser.getfloat('General', name))
+        for name in self.LISTS:
+            setattr(self, name, parser.get('General', name).split(','))
+        # switch off intertoken filter
+        self.testing = 0
+        for name, value in overrides.items():
+            if not hasattr(self, name):
+                raise TypeError('Unknown parameter: {0}'.format(name))
+            if value is not None:
+                setattr(self, name, value)
+
+
+class KeywordExtractor(object):
+    """
+    Keyword extractor for description_text_nlp entries.
+    """
+
+    def __init__(self, config=None, stopwords=None, postwords=None,
+                 patterns=None, profile=False, cache=None, metrics=None,
+                 tracer=None, dftable=None):
+        self.config = config or ExtractorConfig()
+        if None in (stopwords, postwords, patterns):
+            # compiled tables of the resource files (see resources.py)
+            defaults = load_resources()
+            stopwords, postwords, patterns = [
+                default if given is None else given for default, given in
+                zip(defaults, (stopwords, postwords, patterns))]
+        self.stopwords = stopwords
+        self.postwords = postwords
+        self.patterns = PatternFilter(patterns, self.config.patterncache,
+                                      profile=profile)
+        self.postable = postable_for(self.config.poslist)
+        # persistent KeywordCache of keyword lists (see kwcache.py)
+        self.cache = cache
+        self.digest = config_digest(self.config, self.stopwords,
+                                    self.postwords, self.patterns.patterns)
+        # corpus document frequencies (see dftable.py): IDF re-ranking
+        self.dftable = dftable
+        if dftable is not None:
+            self.digest = hashlib.sha1(self.digest +
+                                       dftable.digest).hexdigest()
+        # version stamp of the parameters and resources (see reloader.py)
+        self.version = self.digest[:12]
+        # Metrics of the entries and stages (see metrics.py), if recorded
+        self.metrics = metrics
+        # Tracer of selected entries (see kwtrace.py), if traced
+        self.tracer = tracer
+
+    def extract(self, nlp_entry):
+        """ (dict) -> list
+
+        Return the keyword list of a description_text_nlp entry (list of
+        one item {keyword: rank} dicts, see make_kwlist), empty if there
+        are no keywords or the text is too short.
+        """
+
+        return self.extract_kwlists([nlp_entry])[0] or []
+
+    def extract_many(self, nlp_entries):
+        """ (iterable) -> generator
+
+        Yield the keyword lists of the entries (see extract) computing them
+        in batches.
+        """
+
+        for batch in chunked(nlp_entries, self.config.batchsize):
+            for kwlist in self.extract_kwlists(batch):
+                yield kwlist or []
+
+    def extract_kwlists(self, nlp_entries, ids=None):
+        """ (list, list) -> list
+
+        Return the keyword lists of the entries (see make_kwlist), None for
+        entries under text length limit. Lists found in the cache (if any)
+        are not computed again (nor traced). The ids of the entries are
+        used for tracing (see extract_batch).
+        """
+
+        if self.cache is None:
+            return [make_kwlist(result) if result else None for
+                    result in self.extract_batch(nlp_entries, ids)]
+        keys = ['{0}:{1}'.format(self.digest, entry_digest(nlp_entry))
+                for nlp_entry in nlp_entries]
+        found = self.cache.get_many(keys)
+        missing = [i for i, key in enumerate(keys) if key not in found]
+        if self.metrics is not None:
+            self.count_kwlists([found[key] for key in keys if key in found])
+            self.metrics.count('cached', len(keys) - len(missing))
+        if missing:
+            results = self.extract_batch([nlp_entries[i] for i in missing],
+                                         [ids[i] for i in missing]
+                                         if ids is not None else None)
+            computed = [(keys[i], make_kwlist(result) if result else None)
+                        for i, result in zip(missing, results)]
+            self.cache.put_many(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def count_kwlists(self, kwlists):
+        """ (list) -> None
+
+        Count the entries of the keyword lists in the metrics (see
+        extract_kwlists).
+        """
+
+        metrics = self.metrics
+        metrics.count('entries', len(kwlists))
+        metrics.count('short', kwlists.count(None))
+        metrics.count('nokeywords', kwlists.count([]))
+
+    def select_traces(self, nlp_entries, ids=None):
+        """ (list, list) -> list
+
+        Return the list of the traces of the entries (None for entries not
+        traced, see kwtrace.py). Entries are identified by ids if given, or
+        by the hash of their tokens.
+        """
+
+        if self.tracer is None:
+            return [None] * len(nlp_entries)
+        if ids is None:
+            ids = [entry_digest(nlp_entry) for nlp_entry in nlp_entries]
+        return [self.tracer.select(entry_id) for entry_id in ids]
+
+    def extract_batch(self, nlp_entries, ids=None):
+        """ (list, list) -> list
+
+        Return a list of (rake_candidates, textrank_kw, head, vocab) tuples,
+        one for each nlp entry, or None for entries under text length limit.
+        The TextRank scores of the batch are computed together.
+        The RAKE and TextRank dicts are keyed by tuples of token ids of
+        vocab, head (the final list) by tuples of tokens.
+        Entry counts, stage latencies (TextRank per batch) and sizes are
+        recorded in the metrics of the extractor if any, and the entries
+        selected by its tracer (by ids if given) are traced.
+        """
+
+        config = self.config
+        metrics = self.metrics
+        traces = self.select_traces(nlp_entries, ids)
+        candidates = []
+        for nlp_entry, trace in zip(nlp_entries, traces):
+            # cheap reject by the number of tokens (including punctuation)
+            if sum([len(sentence['tokens']) for sentence in
+                    nlp_entry['sentences']]) < config.textlength:
+                if trace is not None:
+                    trace('short')
+                candidates.append(None)
+                continue
+            if metrics is not None:
+                start = clock()
+            vocab = Vocabulary()
+            # default split of input into fragments, plus text storage
+            doc, numtokens = get_sentences_from_entry(nlp_entry, vocab)
+            if metrics is not None:
+                start = metrics.stage('get_sentences_from_entry', start)
+            if trace is not None:
+                trace.vocab = vocab
+                for first, end in doc.fragments():
+                    trace('fragment', start=first, end=end - 1,
+                          tokens=trace.words(doc.words[first:end]))
+            if numtokens < config.textlength:
+                if trace is not None:
+                    trace('short')
+                candidates.append(None)
+                continue
+            # generate candidate keywords and indexes for postprocessing
+            phraseList, _, phrase_by_index = make_candidates(
+                doc,
+                vocab.select(self.stopwords),
+                config.lemma,
+                self.postable)
+            # number of tokens in the candidates (for the size of the head)
+            numwords = sum([len(phrase) for phrase in phraseList])
+            if metrics is not None:
+                start = metrics.stage('make_candidate_kw', start)
+            if trace is not None:
+                for index in xrange(len(phrase_by_index)):
+                    phrase, first, last = phrase_by_index[index]
+                    trace('phrase', index=index, start=first, end=last,
+                          phrase=trace.words(phrase))
+            # calculate RAKE word scores
+            tokens, phrase_ids = rake.flatten(phraseList)
+            wordscores = rake.word_scores(tokens, phrase_ids, vocab)
+            if metrics is not None:
+                start = metrics.stage('rake_word_scores', start)
+            if trace is not None:
+                for word in np.unique(tokens).tolist():
+                    trace('wordscore', word=vocab.words[word],
+                          score=wordscores[word])
+            # and phrase scores
+            rake_candidates = rake.phrase_scores(phraseList, tokens,
+                                                 phrase_ids, wordscores)
+            if metrics is not None:
+                start = metrics.stage('rake_phrase_scores', start)
+            # postprocess RAKE candidates to get more complex phrases
+            ckw = neighbours(rake_candidates,
+                             doc.words, phrase_by_index,
+                             set([vocab.intern(word) for
+                                  word in config.allowed]),
+                             config.testing,
+                             vocab.lower,
+                             threshold=config.threshold,
+                             gap=config.gap,
+                             trace=trace)
+            # merge the above two results
+            rake_candidates.update(ckw)
+            if metrics is not None:
+                metrics.stage('neighbours', start)
+                metrics.size('candidates', len(phraseList))
+            candidates.append((phraseList, numwords, rake_candidates, vocab,
+                               trace))
+        # compute textrank dicts for the whole batch
+        if metrics is not None:
+            start = clock()
+        textranks = iter(compute_textrank_batch(
+            [candidate[0] for candidate in candidates if candidate],
+            config.window, config.lemma, config.ratio,
+            config.damping, config.maxiter, config.tolerance,
+            [candidate[4] for candidate in candidates if candidate],
+            metrics,
+            [candidate[3] for candidate in candidates if candidate]))
+        if metrics is not None:
+            metrics.stage('compute_textrank', start)
+        results = []
+        for candidate in candidates:
+            if candidate is None:
+                results.append(None)
+                continue
+            if metrics is not None:
+                start = clock()
+            phraseList, numwords, rake_candidates, vocab, trace = candidate
+            textrank_kw = next(textranks)
+            # merge the two rankings into one
+            merged = merge_dict(rake_candidates, textrank_kw)
+            if metrics is not None:
+                start = metrics.stage('merge_dict', start)
+            # apply postfilter (and get back the tokens)
+            postmerged = postfilter(merged, self.postwords, self.patterns,
+                                    config.maxmember, vocab, trace)
+            if metrics is not None:
+                start = metrics.stage('postfilter', start)
+            # add the rank of the IDF of the keywords in the corpus
+            if self.dftable is not None and postmerged:
+                keys = postmerged.keys()
+                idfs = dict(zip(keys, self.dftable.idf(keys).tolist()))
+                postmerged = add_ranks(postmerged, idfs)
+                if trace is not None:
+                    for key in keys:
+                        trace('idf', keyword=" ".join(key), idf=idfs[key],
+                              rank=postmerged[key])
+                if metrics is not None:
+                    start = metrics.stage('idf', start)
+            # take the first N elements only (proportional to text length)
+            head = topranked(postmerged, numwords, config.kwlimit,
+                             config.toprank)
+            if metrics is not None:
+                metrics.stage('topranked', start)
+                metrics.size('keywords', len(head))
+            if trace is not None:
+                trace('keywords', keywords=[[" ".join(key), head[key]] for
+                                            key in sorted(head,
+                                                          key=head.get)])
+            results.append((rake_candidates, textrank_kw, head, vocab))
+        if metrics is not None:
+            metrics.count('entries', len(results))
+            metrics.count('short', results.count(None))
+            metrics.count('nokeywords', len([result for result in results
+                                             if result and not result[2]]))
+        return results
+
+
+def make_kwlist(result):
+    """ (tuple) -> list
+
+    Return the list of {keyword: rank} dicts ordered by rank from an
+    extraction result (see KeywordExtractor.extract_batch).
+    """
+
+    if result is None:
+        return []
+    head = result[2]
+    return [{" ".join(key): head[key]} for
+            key in sorted(head, key=lambda key: (head[key], key))]
+
+
+def compact_kwlist(kwlist):
+    """ (list) -> list, list
+
+    Return the parallel lists of the keywords and of their ranks of a
+    keyword list (see make_kwlist).
+    """
+
+    pairs = [item for kwdict in kwlist for item in kwdict.items()]
+    return [keyword for keyword, _ in pairs], [rank for _, rank in pairs]
+
+
+def get_sentences_from_entry(nlp_entry, vocab):
+    # this is the entry point for this program if integrated
+    # into the pipeline
+    """ (dict, Vocabulary) -> Document, int
+    Return
+    1. the columnar document of the input dict containing an nlp entry:
+    parallel arrays of word ids, lemma ids (in vocab) and POS ids of the
+    non-punctuation tokens with the boundaries of sentence fragments
+    (split by punctuations).
+
+    2. the number of non-punctuation tokens in the text (to allow for
+    text length threshold check).
+
+    Input is the content of the description_text_nlp field.
+    """
+
+    doc = make_document(nlp_entry, vocab)
+    return doc, len(doc)
+
+
+def make_candidate_kw(doc, stopwords, lemma, poslist):
+    """(Document, set, int, list) -> list, dict, dict
+
+    Return
+    1. a list of list of words as candidate phrases for KWs,
+    2. a dictionary of phrase tuples containing positional indeces,
+    3. a dictionary of positional indexes containing
+    (phrase_tuple, textindex_of_first_word, textindex_of_last_word) tuples.
+    The 2. and 3. dictionaries can be used for postprocessing to rejoin phrases
+    into complex KWs.
+    Words are token ids (see get_sentences_from_entry), stopwords is the
+    set of stopword ids.
+    """
+
+    return make_candidates(doc, stopwords, lemma, postable_for(poslist))
+
+
+def postable_for(poslist):
+    """ (list) -> PosTable
+
+    Return the (cached) POS flag table of poslist.
+    """
+
+    key = tuple(poslist)
+    if key not in postables:
+        postables[key] = PosTable(poslist)
+    return postables[key]
+
+
+def rake_word_scores(phraseList, vocab):
+    """(list, Vocabulary) -> dict
+
+    Return a dict of words with their RAKE score values (see rake.py).
+    """
+
+    tokens, phrase_ids = rake.flatten(phraseList)
+    scores = rake.word_scores(tokens, phrase_ids, vocab)
+    words = np.unique(tokens)
+    return dict(zip(words.tolist(), scores[words].tolist()))
+
+
+def compute_textrank(phrase_list, window, lemma, ratio=2, damping=0.85,
+                     max_iterations=100, tolerance=0.00001, trace=None,
+                     vocab=None):
+    """(list, int, int, int, float, int, float, EntryTrace,
+        Vocabulary) -> dict
+
+    Return a dict of KWs with textrank scores.
+    Arguments:
+    - phrase_list: list of candidate phrase lists
+    - window: size of cocccurrence window
+    - lemma: 1 if lemmas are used instead of wordforms
+    - ratio: ratio of all KWs included in the top N list
+    - damping, max_iterations, tolerance: PageRank parameters
+    - trace: trace of the entry (see kwtrace.py) if traced
+    - vocab: vocabulary of the token ids of the phrases, the words decide
+      the sweep order of PageRank and the order of ties as with pygraph
+      (order of appearance if not given)
+    """
+
+    return compute_textrank_batch([phrase_list], window, lemma, ratio,
+                                  damping, max_iterations, tolerance,
+                                  [trace], None,
+                                  [vocab] if vocab is not None else None)[0]
+
+
+def compute_textrank_batch(phrase_lists, window, lemma, ratio=2,
+                           damping=0.85, max_iterations=100,
+                           tolerance=0.00001, traces=None, metrics=None,
+                           vocabs=None):
+    """(list, int, int, int, float, int, float, list, Metrics,
+        list) -> list
+
+    Return a list of dicts of KWs with textrank scores, one for each
+    candidate phrase list in phrase_lists. PageRank is computed in one
+    go for all the documents (see compute_textrank for the arguments,
+    traces and vocabs are the lists of their traces and vocabularies if
+    given).
+    The node and edge counts of the graphs are recorded in metrics if
+    given.
+    """
+
+    # flatten out input phrase lists to get back texts for postprocessing
+    # this is not very optimal
+    texts = [list(itertools.chain.from_iterable(phrase_list))
+             for phrase_list in phrase_lists]
+    # set up graphs: edges for words within window
+    graphs = [build_graph(text, window) for text in texts]
+    if metrics is not None:
+        for nodes, _, indices in graphs:
+            metrics.size('graph_nodes', len(nodes))
+            metrics.size('graph_edges', len(indices))
+    traces = traces or [None] * len(phrase_lists)
+    for trace, (nodes, indptr, indices) in zip(traces, graphs):
+        if trace is not None:
+            for target in xrange(len(nodes)):
+                for source in indices[indptr[target]:indptr[target + 1]]:
+                    trace('edge', source=trace.vocab.words[nodes[source]],
+                          target=trace.vocab.words[nodes[target]])
+    # pygraph swept the nodes in the order of its node dict of the words,
+    # and its score dict (keyed in that order) decided between ties
+    orders = []
+    ties = []
+    for i, (nodes, _, _) in enumerate(graphs):
+        if vocabs is None:
+            orders.append(None)
+            ties.append(nodes)
+            continue
+        words = [vocabs[i].words[node] for node in nodes]
+        order = dict_order(words)
+        orders.append(order)
+        ties.append([nodes[order[index]] for
+                     index in dict_order([words[node] for node in order])])
+
+    # calculate pagerank
+    prdicts = pagerank_batch(graphs, damping=damping,
+                             max_iterations=max_iterations,
+                             tolerance=tolerance, orders=orders)
+    textrank_list = []
+    for phrase_list, text, keys, prdict, trace in zip(
+            phrase_lists, texts, ties, prdicts, traces):
+        prlist = [(key, prdict[key]) for key in sorted(keys,
+                                                       key=prdict.get,
+                                                       reverse=True)]
+        # get first number of nodes/ratio elements
+        if trace is not None:
+            for rank, (key, score) in enumerate(prlist):
+                trace('textrank', word=trace.vocab.words[key], score=score,
+                      kept=rank < len(text) / ratio)
+        prlist = prlist[:len(text) / ratio]
+        # make a dict from the list to facilitate postprocessing
+        prdict = dict(prlist)
+        # postrocess initial result
+        textrank_list.append(post_textrank(prdict, phrase_list))
+    return textrank_list
+
+
+def rake_phrase_scores(phrase_list, word_scores):
+    """(list, dict) -> dict
+
+    Return a dict of phrases with their scores.
+    """
+
+    phrase_scores = {}
+    for phrase in phrase_list:
+        phrase_score = 0
+        for word in phrase:
+            phrase_score += word_scores[word]
+        phrase_scores[tuple(phrase)] = phrase_score
+    return phrase_scores
+
+
+def postfilter(merged, postwords, patterns, maxmember, vocab, trace=None):
+    """(dict, dict, PatternFilter, int, Vocabulary, EntryTrace) -> dict
+
+    Return a filtered result KW dictionary by stoplist and patterns.
+    The returned dictionary is keyed by tuples of tokens (not ids).
+    Arguments:
+    - merged: input dictionary of KWs
+    - postwords: dict of tokens not allowed as individual KWs
+    - patterns: matcher of patterns not allowed in KWs
+    - maxmember: maximum number of tokens allowed in complex KW
+    - vocab: vocabulary of the token ids of KWs
+    - trace: trace of the entry (see kwtrace.py) if traced
+    """
+
+    out = {}
+    words = vocab.words
+    for kw in merged:
+        # check length limit
+        if len(kw) > maxmember:
+            if trace is not None:
+                trace('filter', keyword=vocab.join(kw), decision='maxmember')
+            continue
+        kwtokens = tuple([words[word] for word in kw])
+        # check if one token KW is in forbidden list
+        if len(kw) == 1 and kwtokens[0] in postwords:
+            if trace is not None:
+                trace('filter', keyword=kwtokens[0], decision='postword')
+            continue
+        # check if KW matches forbidden pattern
+        if patterns.match(" ".join(kwtokens)):
+            if trace is not None:
+                trace('filter', keyword=" ".join(kwtokens),
+                      decision='pattern')
+            continue
+        if trace is not None:
+            trace('filter', keyword=" ".join(kwtokens), decision='kept')
+
+        out[kwtokens] = merged[kw]
+
+    return out
@@ -5,22 +5,12 @@ Collection of some utils for kw extraction.
 @Author: oraveczcsaba
 """
 
+import re
 import sys
+import heapq
 import itertools
 
-
-def load_stopwords(file):
-    """ (file) -> dict
-
-    Return dict of words from file.
-    """
-    stop_words = {}
-    for line in open(file):
-        if line.strip()[:1] != "#":
-            for word in line.split():
-                stop_words[word] = stop_words.get(word, 0) + 1
-
-    return stop_words
+DIGIT = re.compile(r'\d', re.U)
 
 
 def unique(seq):
@@ -29,7 +19,24 @@ def unique(seq):
     return [x for x in seq if x not in seen and not seen.add(x)]
 
 
+def chunked(seq, size):
+    """ (iterable, int) -> generator
+
+    Yield lists of at most size consecutive elements of input.
+    """
+
+    seq = iter(seq)
+    chunk = list(itertools.islice(seq, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(seq, size))
+
+
 def isNumeric(s):
+    # only strings with a digit can be numbers (cheap reject before the
+    # conversion)
+    if not DIGIT.search(s):
+        return False
     try:
         float(s) if '.' in s else int(s)
         return True
@@ -37,75 +44,72 @@ def isNumeric(s):
         return False
 
 
-def printout(dict, reverse=True):
+def printout(dict, reverse=True, out=None):
     """(dict) -> None
 
-    Prints out input dict reverse value sorted.
+    Prints out input dict reverse value sorted (to stdout by default).
     """
 
-    for key in sorted(dict, key=dict.get, reverse=reverse):
-        sys.stdout.write('{0}\t{1}\n'.format(key, dict[key]))
+    out = out or sys.stdout
+    for key in sorted(dict, key=lambda key: (dict[key], key),
+                      reverse=reverse):
+        out.write('{0}\t{1}\n'.format(key, dict[key]))
 
 
-def neighbours(debug,
-               pdict,
+def neighbours(pdict,
                sent_dict,
-               ph_token,
                ph_index,
                allowed,
                testing,
+               lower,
                threshold=2,
-               gap=1):
-    """ (int, dict, dict, dict, int?, int?) -> dict
+               gap=1,
+               trace=None):
+    """ (dict, array, dict, set, int, function, int, int, EntryTrace) -> dict
 
     Return dict of phrase tuples which occur next to each other at least
     threshold number of times. Key value is combined score.
+    Consecutive phrases are checked in one pass over ph_index, and the
+    tokens in between are looked at only if there are at most gap of them,
+    so the time taken is linear in the length of the text for any gap.
     Arguments:
     - pdict: dict of phrase tuples containing their score
-    - sent_dict: the position indexed sentence dictionary
-    - ph_token: dictionary of phrase tuples of their positional indexes
+    - sent_dict: the token ids of the text by text position
     - ph_index: dict of positional indeces of
       ((phrase_tuple), firstwordindex, lastwordinex)
+    - allowed: set of token ids allowed in between phrases
     - testing: if 1 switch off intertoken filter
+    - lower: function returning the id of the lower cased form of a token id
     - threshold: number of times phrases must be adjacent to each other
     - gap: number of tokens allowed in between two adjacent units
+    - trace: trace of the entry (see kwtrace.py) if traced
     """
 
     neighbours = {}
     complex_phrases = {}
     # build neighbour dictionary for complex candidates
-    for phrase in pdict:
-        for index in ph_token[phrase]:
-            if debug:
-                write_out(("CHECKING:", phrase, "with index", index))
-            if index + 1 >= len(ph_index):
-                if debug:
-                    write_out(("LAST MEMBER, NO NEXT UNIT",))
-                continue
-            if ph_index[index+1][0] in pdict:
-                if debug:
-                    write_out(("NEIGHBOUR:", ph_index[index+1][0]))
-                # check index diff <= gap (+1)
-                # store also the intermediate tokens as part of index
-                # because they must be the same to count as a fixed phrase!
-                diff = ph_index[index+1][1] - ph_index[index][2]
-                # the index diff must be leq than gap but > 1!
-                # (otherwise we collect tokens originally separated by
-                # punctuation!)
-                if diff <= gap + 1 and diff > 1:
-                    inter = tuple([sent_dict[i][0].lower() for i
-                                   in range(ph_index[index][2]+1,
-                                            ph_index[index+1][1])])
-                    if debug:
-                        write_out(("INTOK:", inter))
-                    # at least one token must intervene!
-                    if check_inter(inter, allowed, testing):
-                        unit = (phrase,
-                                ph_index[index+1][0],
-                                inter)
-                        neighbours[unit] = neighbours.get(unit, 0) + 1
-                        if debug:
-                            write_out(("ADDING", unit))
+    for index in xrange(len(ph_index) - 1):
+        phrase, _, last = ph_index[index]
+        next_phrase, first, _ = ph_index[index + 1]
+        if phrase not in pdict or next_phrase not in pdict:
+            continue
+        # the index diff must be leq than gap (+1) but > 1!
+        # (otherwise we collect tokens originally separated by
+        # punctuation!)
+        if not 1 < first - last <= gap + 1:
+            continue
+        # store also the intermediate tokens as part of index
+        # because they must be the same to count as a fixed phrase!
+        inter = tuple([lower(word) for word in sent_dict[last + 1:first]])
+        # at least one token must intervene!
+        accepted = check_inter(inter, allowed, testing)
+        if trace is not None:
+            trace('neighbour', index=index, phrase=trace.words(phrase),
+                  next=trace.words(next_phrase), inter=trace.words(inter),
+                  accepted=accepted)
+        if accepted:
+            unit = (phrase, next_phrase, inter)
+            neighbours[unit] = neighbours.get(unit, 0) + 1
 
     for nb in neighbours:
         if neighbours[nb] >= threshold:
@@ -116,12 +120,9 @@ def neighbours(debug,
             complex_phrases[ckw] = combine_scores(neighbours[nb],
                                                   pdict[nb[0]],
                                                   pdict[nb[1]])
-            if debug:
-                write_out(("CKW:", neighbours[nb],
-                           ckw,
-                           combine_scores(neighbours[nb],
-                                          pdict[nb[0]],
-                                          pdict[nb[1]])))
+            if trace is not None:
+                trace('complex', keyword=trace.words(ckw),
+                      count=neighbours[nb], score=complex_phrases[ckw])
 
     return complex_phrases
 
@@ -167,58 +168,73 @@ def merge_dict(dict1, dict2):
     # gets the sum of its ranks from both, if present only in one then
     # gets rank in one + shift
     # ('shift' currently is the average length of the input dicts)
-    out = {}
     shift = (len(dict1) + len(dict2)) / 2
-    rdict1 = make_ranks(dict1)
-    rdict2 = make_ranks(dict2)
-    # nasty bugfix: need to make a copy of original dict1 because
-    # we need it later
-    dict1_copy = dict(dict1)
-    dict1_copy.update(dict2)
-    for key in dict1_copy:
-        if key in rdict1 and key in rdict2:
-            out[key] = rdict1[key] + rdict2[key]
+    ranks1 = value_ranks(dict1.itervalues())
+    ranks2 = value_ranks(dict2.itervalues())
+    out = {}
+    for key, value in dict1.iteritems():
+        if key in dict2:
+            out[key] = ranks1[value] + ranks2[dict2[key]]
         else:
-            rank = rdict1[key] if key in rdict1 else rdict2[key]
-            out[key] = rank + shift
+            out[key] = ranks1[value] + shift
+    for key, value in dict2.iteritems():
+        if key not in dict1:
+            out[key] = ranks2[value] + shift
     return out
 
 
+def add_ranks(indict, scores):
+    """ (dict, dict) -> dict
+
+    Return a dictionary of the input ranks with the rank of the score of
+    the key added (scores has all the keys of indict, higher scores rank
+    first), eg. to take IDF as one more signal after merge_dict.
+    """
+
+    ranks = value_ranks(scores.itervalues())
+    return dict([(key, value + ranks[scores[key]]) for
+                 key, value in indict.iteritems()])
+
+
+def value_ranks(values):
+    """ (iterable) -> dict
+
+    Return a dict of the distinct values with their rank: 1 + the number
+    of values greater than them (so ties get the same rank).
+    """
+
+    values = sorted(values)
+    # the highest rank of a tie is overwritten by the lower ones
+    return dict(itertools.izip(values, xrange(len(values), 0, -1)))
+
+
 def make_ranks(indict):
     """ (dict) -> dict
 
     Return a dict where values are transformed into ranks.
     """
 
-    out = {}
-    rank = 1
-    prank = 1
-    pvalue = 0
-    for key in sorted(indict, key=indict.get, reverse=True):
-        value = indict[key]
-        if value == pvalue:
-            # it's a tie so assign same rank
-            out[key] = prank
-        else:
-            out[key] = rank
-            prank = rank
-        rank += 1
-        pvalue = value
-    return out
+    ranks = value_ranks(indict.itervalues())
+    return dict([(key, ranks[value]) for key, value in indict.iteritems()])
 
 
-def topranked(indict, plist, limit, ratio=2):
-    """ (dict, list, int, int) -> dict
+def topranked(indict, numwords, limit, ratio=2):
+    """ (dict, int, int, int) -> dict
 
     Return a dictionary of the first N elements by value form the input dict.
-    N is len(plist)/ratio. If limit is < N, N is set to limit.
+    N is numwords/ratio (numwords being the number of tokens in the
+    candidate phrases). If limit is < N, N is set to limit.
+    Only the first N elements are taken from a heap, the dict is not
+    sorted.
     """
-    head = len(list(itertools.chain.from_iterable(plist))) / ratio
-    if head > limit:
-        head = limit
-    fullist = [(key, indict[key]) for key in sorted(indict,
-                                                    key=indict.get)]
-    return dict(fullist[:head])
+
+    head = min(numwords / ratio, limit, len(indict))
+    # ties are taken in key order
+    heap = [(value, key) for key, value in indict.iteritems()]
+    heapq.heapify(heap)
+    pop = heapq.heappop
+    return dict([(key, value) for value, key in
+                 [pop(heap) for _ in xrange(head)]])
 
 
 def combine_scores(freq, *args):
@@ -235,22 +251,7 @@ def check_inter(inter, allowed, testing):
     Input is a tuple of word(s) that apperar(s) in between KW candidates.
     """
 
-    if testing:
-        return True
-
-    for token in inter:
-        if token not in allowed:
-            return False
-    return True
-
-
-def write_out(seq):
-    """ (list) -> None
-
-    Print out input arg.
-    """
-
-    print " ".join([str(x) for x in seq])
+    return bool(testing) or allowed.issuperset(inter)
 
 
 if __name__ == "__main__":
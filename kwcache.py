@@ -0,0 +1,186 @@
+# coding: utf-8
+"""
+Persistent keyword result cache for KW extraction.
+
+Keyword lists are stored in an sqlite file keyed by a hash of the tokens
+of the description_text_nlp entry and a hash of the effective
+configuration (kw.cfg values with overrides, and the stopword, postword
+and pattern resources), so results computed with other settings are never
+returned. The number of entries is bounded, least recently used ones are
+evicted first. Several processes (eg. the -j workers) and threads can use
+the same file, sqlite locking keeps it consistent.
+
+@Author: oraveczcsaba
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import cPickle
+import threading
+
+# bump to invalidate all cached results if extraction itself changes
+CACHE_VERSION = 1
+# parameters that do not change the keywords of an entry
+RUNTIME_PARAMS = ('batchsize', 'maxtasks', 'inflight', 'patterncache',
+                  'cachesize', 'metricsinterval', 'reloadinterval',
+                  'queuesize', 'batchwait', 'requesttimeout')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB,
+    used REAL);
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER);
+INSERT OR IGNORE INTO stats VALUES ('size', 0);
+INSERT OR IGNORE INTO stats VALUES ('hits', 0);
+INSERT OR IGNORE INTO stats VALUES ('misses', 0);
+INSERT OR IGNORE INTO stats VALUES ('evictions', 0);
+"""
+
+
+def entry_digest(nlp_entry):
+    """ (dict) -> str
+
+    Return the hash of the tokens (word, lemma, POS) of the content of a
+    description_text_nlp field.
+    """
+
+    digest = hashlib.sha1()
+    update = digest.update
+    for sentence in nlp_entry['sentences']:
+        for token in sentence['tokens']:
+            update(u'{0}\0{1}\0{2}\0'.format(
+                token['word'], token['lemma'], token['POS']).encode('utf-8'))
+        update('\1')
+    return digest.hexdigest()
+
+
+def config_digest(config, stopwords, postwords, patterns):
+    """ (ExtractorConfig, dict, dict, dict) -> str
+
+    Return the hash of the parameters (except the runtime ones) and the
+    resources of an extractor.
+    """
+
+    params = sorted([(name, value) for name, value in
+                     vars(config).items() if name not in RUNTIME_PARAMS])
+    digest = hashlib.sha1(repr((CACHE_VERSION, params)))
+    for resource in (stopwords, postwords, patterns):
+        digest.update(repr(sorted(resource)))
+    return digest.hexdigest()
+
+
+class KeywordCache(object):
+    """
+    Size bounded LRU store of keyword lists in an sqlite file.
+    """
+
+    def __init__(self, filename, maxsize=1000000, timeout=60):
+        self.filename = filename
+        self.maxsize = maxsize
+        self.timeout = timeout
+        # connection and pid of each thread
+        self.local = threading.local()
+
+    def connect(self):
+        """ () -> Connection
+
+        Return the connection of the current thread and process (sqlite
+        connections can not be used by other threads, and forked workers
+        must not share the connection of their parent).
+        """
+
+        local = self.local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = sqlite3.connect(self.filename, self.timeout)
+            local.connection.text_factory = str
+            local.connection.execute('PRAGMA journal_mode=WAL')
+            with local.connection:
+                local.connection.executescript(SCHEMA)
+            local.pid = os.getpid()
+        return local.connection
+
+    def get_many(self, keys):
+        """ (list) -> dict
+
+        Return the dict of the cached values found for keys, marking them
+        as recently used.
+        """
+
+        connection = self.connect()
+        found = {}
+        # stay under the sqlite limit of host parameters
+        for start in xrange(0, len(keys), 500):
+            part = keys[start:start + 500]
+            found.update([(key, cPickle.loads(str(value))) for key, value in
+                          connection.execute(
+                              'SELECT key, value FROM entries WHERE key IN '
+                              '({0})'.format(','.join('?' * len(part))),
+                              part)])
+        hits = len(found)
+        misses = len(set(keys)) - hits
+        now = time.time()
+        with connection:
+            connection.executemany('UPDATE entries SET used = ? '
+                                   'WHERE key = ?',
+                                   [(now, key) for key in found])
+            connection.executemany('UPDATE stats SET value = value + ? '
+                                   'WHERE name = ?',
+                                   [(hits, 'hits'), (misses, 'misses')])
+        return found
+
+    def put_many(self, items):
+        """ (list) -> None
+
+        Store the (key, value) pairs, evicting the least recently used
+        entries if the cache gets over its size limit.
+        """
+
+        connection = self.connect()
+        now = time.time()
+        with connection:
+            added = connection.executemany(
+                'INSERT OR IGNORE INTO entries VALUES (?, ?, ?)',
+                [(key, sqlite3.Binary(cPickle.dumps(value, -1)), now)
+                 for key, value in items]).rowcount
+            connection.execute("UPDATE stats SET value = value + ? "
+                               "WHERE name = 'size'", (added,))
+            size = self.stats()['size']
+            if size > self.maxsize:
+                # make some room at once to evict less often
+                evicted = connection.execute(
+                    'DELETE FROM entries WHERE key IN (SELECT key FROM '
+                    'entries ORDER BY used LIMIT ?)',
+                    (size - self.maxsize + self.maxsize // 10,)).rowcount
+                connection.executemany('UPDATE stats SET value = value + ? '
+                                       'WHERE name = ?',
+                                       [(-evicted, 'size'),
+                                        (evicted, 'evictions')])
+
+    def stats(self):
+        """ () -> dict
+
+        Return the stored statistics (size, and hits, misses and evictions
+        of all processes using the file).
+        """
+
+        return dict(self.connect().execute('SELECT name, value FROM stats'))
+
+    def report(self, since=None):
+        """ (dict) -> str
+
+        Return a report of the statistics, of hits, misses and evictions
+        counted after since (an earlier stats()) if given.
+        """
+
+        stats = self.stats()
+        since = since or dict.fromkeys(stats, 0)
+        return ('KW CACHE:\thits {0}\tmisses {1}\tevictions {2}\t'
+                'size {3}\n').format(*[stats[name] - since[name] for name in
+                                        ('hits', 'misses', 'evictions')] +
+                                      [stats['size']])
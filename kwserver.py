@@ -0,0 +1,524 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Persistent local KW extraction server.
+
+Keeps an extractor loaded and serves keyword requests over HTTP on a
+localhost port or a Unix socket (--listen host:port or path):
+
+- POST /extract with a json description_text_nlp payload returns
+  {"keywords": [...], "version": ...}, with a json list of payloads the
+  keywords are a list of keyword lists in the same order,
+- GET /stats returns the request counts, the queue length and the p50/p99
+  latencies of the recent requests (plus the run metrics with --metrics).
+
+Requests from concurrent connections are put on a bounded queue and a
+single extraction thread takes them in micro-batches: it waits at most
+batchwait milliseconds for a batch of batchsize entries (see kw.cfg).
+When the queue (queuesize requests) is full, new requests get a 503
+response, so clients back off instead of piling up work, and a request
+not done in requesttimeout seconds gets a 504 response.
+See bench_kw.py server for a load generator.
+
+@Author: oraveczcsaba
+"""
+
+import os
+import sys
+import json
+import stat
+import time
+import errno
+import Queue
+import signal
+import socket
+import httplib
+import argparse
+import threading
+import traceback
+import collections
+import SocketServer
+import BaseHTTPServer
+from extractor import ExtractorConfig, KeywordExtractor
+from kwcache import KeywordCache
+from metrics import Metrics, MetricsWriter, clock
+from reloader import ExtractorReloader, watched_files
+from dftable import DFTable
+
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+# number of recent request latencies kept for the percentiles
+LATENCY_WINDOW = 10000
+
+
+def parse_address(address):
+    """ (str) -> tuple or str
+
+    Return the (host, port) of a host:port address, or the path of a Unix
+    socket (an address with a / in it).
+    """
+
+    if '/' in address:
+        return address
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def percentile(values, fraction):
+    """ (list, float) -> float
+
+    Return the fraction percentile of the sorted values (nearest rank),
+    None if there are none.
+    """
+
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class UnixHTTPConnection(httplib.HTTPConnection):
+    """
+    HTTPConnection over a Unix socket.
+    """
+
+    def __init__(self, path, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
+        httplib.HTTPConnection.__init__(self, 'localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def connect(address, timeout=60):
+    """ (str, float) -> HTTPConnection
+
+    Return a connection to a server at address (see parse_address).
+    """
+
+    address = parse_address(address)
+    if isinstance(address, tuple):
+        return httplib.HTTPConnection(address[0], address[1],
+                                      timeout=timeout)
+    return UnixHTTPConnection(address, timeout=timeout)
+
+
+def call(connection, method, path, payload=None):
+    """ (HTTPConnection, str, str, object) -> int, object
+
+    Send a request with a json payload and return the status and the
+    decoded json response.
+    """
+
+    body = json.dumps(payload) if payload is not None else None
+    connection.request(method, path, body,
+                       {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+class Request(object):
+    """
+    Extraction request waiting in the queue.
+    """
+
+    def __init__(self, nlp_entries):
+        self.nlp_entries = nlp_entries
+        self.done = threading.Event()
+        self.kwlists = None
+        self.version = None
+        self.error = None
+
+
+class LatencyStats(object):
+    """
+    Request and entry counts with the latencies of the recent requests.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.lock = threading.Lock()
+        self.latencies = collections.deque(maxlen=window)
+        self.counts = dict.fromkeys(('requests', 'entries', 'batches',
+                                     'batched', 'rejected', 'failed',
+                                     'timedout'), 0)
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counts[name] += value
+
+    def observe(self, latency):
+        with self.lock:
+            self.latencies.append(latency)
+
+    def as_dict(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            stats = dict(self.counts)
+        stats['p50'] = percentile(latencies, 0.5)
+        stats['p99'] = percentile(latencies, 0.99)
+        return stats
+
+
+class Batcher(object):
+    """
+    Bounded queue of requests processed in micro-batches by one thread.
+    """
+
+    def __init__(self, get_extractor, batchsize, queuesize, batchwait,
+                 stats, writer=None, timeout=60):
+        """
+        Arguments:
+        - get_extractor: function returning the current KeywordExtractor
+        - batchsize: number of entries a batch is filled up to
+        - queuesize: number of requests the queue holds
+        - batchwait: seconds to wait for the batch to fill up
+        - stats: LatencyStats of the server
+        - writer: MetricsWriter of the run metrics (if any)
+        - timeout: seconds a handler waits for its request to be done
+        """
+
+        self.get_extractor = get_extractor
+        self.batchsize = batchsize
+        self.batchwait = batchwait
+        self.timeout = timeout
+        self.queue = Queue.Queue(queuesize)
+        self.stats = stats
+        self.writer = writer
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+
+    def submit(self, nlp_entries):
+        """ (list) -> Request
+
+        Queue the entries and return their Request. Raise Queue.Full if
+        the queue is full.
+        """
+
+        request = Request(nlp_entries)
+        self.queue.put_nowait(request)
+        return request
+
+    def next_batch(self):
+        """ () -> list
+
+        Return the next requests to process: wait for one, then take more
+        until batchsize entries or batchwait seconds.
+        """
+
+        batch = [self.queue.get()]
+        size = len(batch[0].nlp_entries)
+        deadline = clock() + self.batchwait
+        while size < self.batchsize:
+            remaining = deadline - clock()
+            if remaining <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=remaining)
+            except Queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.nlp_entries)
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            try:
+                self.stats.count('batches')
+                self.stats.count('batched', len(batch))
+                self.process(batch)
+                if self.writer is not None:
+                    self.writer.tick()
+            except Exception:
+                # the thread must go on, or every request would hang:
+                # fail the requests of the batch not answered yet
+                error = sys.exc_info()[1]
+                traceback.print_exc()
+                for request in batch:
+                    if not request.done.is_set():
+                        request.error = error
+                        request.done.set()
+
+    def process(self, batch):
+        """ (list) -> None
+
+        Extract the keywords of a batch of requests and wake up their
+        handlers. If the batch fails, its requests are retried one by one
+        so only the failing ones get the error.
+        """
+
+        batch_extractor = self.get_extractor()
+        try:
+            kwlists = batch_extractor.extract_kwlists(
+                [nlp_entry for request in batch
+                 for nlp_entry in request.nlp_entries])
+        except Exception:
+            if len(batch) > 1:
+                for request in batch:
+                    self.process([request])
+                return
+            batch[0].error = sys.exc_info()[1]
+            batch[0].done.set()
+            return
+        start = 0
+        for request in batch:
+            end = start + len(request.nlp_entries)
+            request.kwlists = [kwlist or [] for kwlist in kwlists[start:end]]
+            request.version = batch_extractor.version
+            request.done.set()
+            start = end
+
+
+class ExtractHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    HTTP handler of the extraction requests (see module doc).
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # send a response in one piece (flushed by handle_one_request), not
+    # line by line, which stalls on delayed ACKs over TCP
+    wbufsize = -1
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections.add(self.connection)
+
+    def finish(self):
+        with self.server.lock:
+            self.server.connections.discard(self.connection)
+        BaseHTTPServer.BaseHTTPRequestHandler.finish(self)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, format,
+                                                              *args)
+
+    def respond(self, status, payload, headers=()):
+        body = json.dumps(payload)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/stats':
+            self.respond(404, {'error': 'Unknown path: ' + self.path})
+            return
+        stats = self.server.stats.as_dict()
+        stats['queue'] = self.server.batcher.queue.qsize()
+        stats['version'] = self.server.batcher.get_extractor().version
+        metrics = self.server.batcher.get_extractor().metrics
+        if metrics is not None:
+            stats['metrics'] = metrics.as_dict()
+        self.respond(200, stats)
+
+    def do_POST(self):
+        start = clock()
+        if self.path != '/extract':
+            self.respond(404, {'error': 'Unknown path: ' + self.path})
+            return
+        try:
+            payload = json.loads(self.rfile.read(
+                int(self.headers.getheader('Content-Length', 0))))
+        except ValueError as e:
+            self.respond(400, {'error': 'Invalid json: {0}'.format(e)})
+            return
+        single = not isinstance(payload, list)
+        stats = self.server.stats
+        try:
+            request = self.server.batcher.submit([payload] if single
+                                                 else payload)
+        except Queue.Full:
+            stats.count('rejected')
+            self.respond(503, {'error': 'Queue full'},
+                         [('Retry-After', '1')])
+            return
+        if not request.done.wait(self.server.batcher.timeout):
+            stats.count('timedout')
+            self.respond(504, {'error': 'Timed out'})
+            return
+        stats.count('requests')
+        stats.count('entries', len(request.nlp_entries))
+        if request.error is not None:
+            stats.count('failed')
+            self.respond(500, {'error': repr(request.error)})
+            return
+        stats.observe(clock() - start)
+        self.respond(200, {'keywords': request.kwlists[0] if single
+                           else request.kwlists,
+                           'version': request.version})
+
+
+class ServerMixIn(SocketServer.ThreadingMixIn):
+    """
+    Threads and open (keep-alive) connections of the servers.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # clients going away are not errors of the server
+        if not isinstance(sys.exc_info()[1], socket.error):
+            SocketServer.ThreadingMixIn.handle_error(self, request,
+                                                     client_address)
+
+    def close_connections(self, timeout=1.0):
+        """ (float) -> None
+
+        Shut down the open connections and wait at most timeout seconds
+        for their handlers to return.
+        """
+
+        with self.lock:
+            connections = list(self.connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+        deadline = clock() + timeout
+        while self.connections and clock() < deadline:
+            time.sleep(0.01)
+
+
+class HTTPServer(ServerMixIn, BaseHTTPServer.HTTPServer):
+    pass
+
+
+class UnixHTTPServer(ServerMixIn, SocketServer.UnixStreamServer):
+    pass
+
+
+def make_server(address, batcher, stats, verbose=False):
+    """ (str, Batcher, LatencyStats, bool) -> SocketServer
+
+    Return the server listening on address (see parse_address).
+    """
+
+    address = parse_address(address)
+    if isinstance(address, tuple):
+        server = HTTPServer(address, ExtractHandler)
+    else:
+        try:
+            mode = os.lstat(address).st_mode
+        except OSError:
+            mode = None
+        if mode is not None:
+            # only a stale socket (eg. of a killed server) is replaced
+            if not stat.S_ISSOCK(mode):
+                raise IOError('Not a socket: {0}'.format(address))
+            os.remove(address)
+        server = UnixHTTPServer(address, ExtractHandler)
+    server.batcher = batcher
+    server.stats = stats
+    server.verbose = verbose
+    server.lock = threading.Lock()
+    server.connections = set()
+    return server
+
+
+def parse_args(argv=None):
+    """ (list) -> Namespace
+
+    Return the parsed command line.
+    """
+
+    ap = argparse.ArgumentParser(
+        description="""
+        Serve KW extraction requests over HTTP.
+        """)
+    ap.add_argument('--listen', action='store', dest='listen', type=str,
+                    default=DEFAULT_ADDRESS,
+                    help='host:port or Unix socket path to listen on '
+                    '(default: %(default)s)')
+    ap.add_argument('-l', '--lemma', action="count",
+                    help='use lemmas instead of wordforms')
+    ap.add_argument('-p', action='store', dest='pos', type=str,
+                    help='(comma separated list of) pos regexps to include')
+    ap.add_argument('--cache', action='store', dest='cache', type=str,
+                    help='keyword cache file')
+    ap.add_argument('--metrics', action='store', dest='metrics', type=str,
+                    help='file to dump run metrics to periodically (json '
+                    'lines, or OpenMetrics text if it ends with .prom)')
+    ap.add_argument('--idf', action='store', dest='idf', type=str,
+                    help='document frequency table of the corpus (see '
+                    'dftable.py) to add the IDF rank of the keywords')
+    ap.add_argument('--reload', action="count",
+                    help='reload kw.cfg, the resource files and the --idf '
+                    'table when they change')
+    ap.add_argument('-v', '--verbose', action="count",
+                    help='log the requests to stderr')
+    ap.add_argument('--version', action='version', version='%(prog)s 0.1')
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Run the server until interrupted.
+    """
+
+    args = parse_args(argv)
+    overrides = dict(poslist=args.pos.split(',') if args.pos else None,
+                     lemma=1 if args.lemma else None)
+    config = ExtractorConfig(**overrides)
+    cache = KeywordCache(args.cache, config.cachesize) if args.cache \
+        else None
+    metrics = Metrics() if args.metrics else None
+
+    def make_extractor():
+        return KeywordExtractor(ExtractorConfig(**overrides), cache=cache,
+                                metrics=metrics,
+                                dftable=DFTable.open(args.idf)
+                                if args.idf else None)
+
+    if args.reload:
+        get_extractor = ExtractorReloader(
+            make_extractor, config.reloadinterval,
+            watched_files() + [args.idf] if args.idf else None).current
+    else:
+        get_extractor = lambda extractor=make_extractor(): extractor
+    writer = MetricsWriter(args.metrics, metrics, config.metricsinterval) \
+        if metrics is not None else None
+    stats = LatencyStats()
+    batcher = Batcher(get_extractor, config.batchsize, config.queuesize,
+                      config.batchwait / 1000.0, stats, writer,
+                      config.requesttimeout)
+    try:
+        server = make_server(args.listen, batcher, stats, args.verbose)
+    except IOError as e:
+        sys.exit('Can not listen on {0}: {1}'.format(args.listen, e))
+    # stop on SIGTERM as on ^C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    batcher.thread.start()
+    sys.stderr.write('Serving version {0} on {1}\n'.format(
+        get_extractor().version, args.listen))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.close_connections()
+        if not isinstance(parse_address(args.listen), tuple):
+            try:
+                os.remove(args.listen)
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+        if writer is not None:
+            writer.write()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# coding: utf-8
+"""
+Structured tracing of KW extraction.
+
+A Tracer selects the entries to be traced, by entry ID and/or by a
+sampled fraction of the IDs (by a hash, so all processes make the same
+decision), and writes the events of the extraction of the selected entries
+(fragments, phrase boundaries, word scores, graph edges, TextRank scores,
+neighbour units, filter decisions, IDF ranks, the final keywords) as json
+lines to a sink file. The extraction functions take an EntryTrace, or None
+if the entry is not traced, so tracing costs a None check when off.
+
+Events are json objects with 'entry' (ID) and 'event' (name) keys and the
+fields of the event; tokens are given as strings.
+
+@Author: oraveczcsaba
+"""
+
+import os
+import sys
+import json
+import hashlib
+import threading
+
+
+class Tracer(object):
+    """
+    Selector of traced entries and writer of their events. The sink ('-'
+    for stderr) is opened (for appending) by each process at its first
+    event, so a tracer can be pickled (eg. broadcast under spark) and
+    shared by threads and worker processes.
+    """
+
+    def __init__(self, filename='-', ids=None, sample=0.0):
+        self.filename = filename
+        self.ids = set([unicode(entry_id) for entry_id in ids or ()])
+        self.sample = sample
+        self.lock = threading.Lock()
+        self.sink = None
+        self.pid = None
+
+    def __getstate__(self):
+        return self.filename, self.ids, self.sample
+
+    def __setstate__(self, state):
+        self.__init__(state[0], state[1], state[2])
+
+    def select(self, entry_id):
+        """ (object) -> EntryTrace or None
+
+        Return the trace of the entry if it is to be traced.
+        """
+
+        key = unicode(entry_id)
+        if key in self.ids or (self.sample and int(hashlib.md5(
+                key.encode('utf-8')).hexdigest()[:8], 16) <
+                self.sample * 0x100000000):
+            return EntryTrace(self, entry_id)
+        return None
+
+    def write(self, event):
+        """ (dict) -> None
+
+        Write an event to the sink.
+        """
+
+        line = json.dumps(event) + '\n'
+        with self.lock:
+            if self.pid != os.getpid():
+                self.sink = sys.stderr if self.filename == '-' \
+                    else open(self.filename, 'a')
+                self.pid = os.getpid()
+            self.sink.write(line)
+            self.sink.flush()
+
+
+class EntryTrace(object):
+    """
+    Event emitter of one traced entry. The vocabulary of the entry (set
+    by the extractor) is used to give tokens as strings.
+    """
+
+    __slots__ = ('tracer', 'entry', 'vocab')
+
+    def __init__(self, tracer, entry):
+        self.tracer = tracer
+        self.entry = entry
+        self.vocab = None
+
+    def __call__(self, event, **fields):
+        fields['entry'] = self.entry
+        fields['event'] = event
+        self.tracer.write(fields)
+
+    def words(self, ids):
+        """ (iterable) -> list
+
+        Return the tokens of the token ids.
+        """
+
+        return [self.vocab.words[token_id] for token_id in ids]
@@ -0,0 +1,121 @@
+# coding: utf-8
+"""
+Minimal local stand-in for the parts of the Spark API used by
+extract_kw.process_spark (parallelize, mapPartitions, broadcast,
+accumulator, collect) to try the spark route without a cluster.
+
+Broadcast values and partition functions are pickled as they would be
+when shipped to executors, so unpicklable state shows up locally, too.
+
+Example:
+    sc = LocalContext()
+    rdd = sc.parallelize(entry_units, 4)
+    counters = {}
+    print process_spark(rdd, counters=counters).collect()
+    print counters['short'].value
+
+@Author: oraveczcsaba
+"""
+
+import pickle
+
+
+class LocalAccumulator(object):
+    """
+    Counter with the interface of a Spark accumulator. Values other than
+    numbers are added by accum_param (see metrics.MetricsParam).
+    """
+
+    def __init__(self, value=0, accum_param=None):
+        self.value = value
+        self.accum_param = accum_param
+
+    def add(self, term):
+        if self.accum_param is None:
+            self.value += term
+        else:
+            # terms are shipped from the executors
+            self.value = self.accum_param.addInPlace(
+                self.value, pickle.loads(pickle.dumps(term, -1)))
+
+    def __iadd__(self, term):
+        self.add(term)
+        return self
+
+
+class LocalBroadcast(object):
+    """
+    Read only value with the interface of a Spark broadcast variable.
+    """
+
+    def __init__(self, value):
+        self.value = pickle.loads(pickle.dumps(value, -1))
+
+
+class LocalRDD(object):
+    """
+    List of partitions with (lazy) mapPartitions.
+    """
+
+    def __init__(self, context, partitions, func=None):
+        self.context = context
+        self.partitions = partitions
+        self.func = func
+
+    def mapPartitions(self, func):
+        """ (function) -> LocalRDD
+
+        Return a new RDD of func applied to each partition.
+        """
+
+        # accumulators are shared, not copied to the executors
+        return LocalRDD(self.context, self, func)
+
+    def getNumPartitions(self):
+        if self.func is None:
+            return len(self.partitions)
+        return self.partitions.getNumPartitions()
+
+    def iter_partitions(self):
+        """ () -> list
+
+        Return the list of partitions as iterators.
+        """
+
+        if self.func is None:
+            return [iter(partition) for partition in self.partitions]
+        pickle.dumps(self.func, -1)
+        return [self.func(partition)
+                for partition in self.partitions.iter_partitions()]
+
+    def collect(self):
+        """ () -> list
+
+        Return all elements of the RDD.
+        """
+
+        return [item for partition in self.iter_partitions()
+                for item in partition]
+
+
+class LocalContext(object):
+    """
+    Stand-in for SparkContext.
+    """
+
+    def parallelize(self, data, numSlices=2):
+        """ (list, int) -> LocalRDD
+
+        Return an RDD of data split into numSlices partitions.
+        """
+
+        data = list(data)
+        size = -(-len(data) // numSlices) or 1
+        return LocalRDD(self, [data[i:i + size]
+                               for i in range(0, len(data), size)])
+
+    def broadcast(self, value):
+        return LocalBroadcast(value)
+
+    def accumulator(self, value, accum_param=None):
+        return LocalAccumulator(value, accum_param)
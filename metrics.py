@@ -0,0 +1,262 @@
+# coding: utf-8
+"""
+Run metrics of KW extraction.
+
+A Metrics object counts the entries seen by an extractor (processed,
+without nlp field, under text length limit, without keywords, read from
+the cache, failed) and keeps histograms of the latency of the extraction
+stages and of per entry sizes (cooccurrence graph nodes and edges,
+candidate phrases, keywords). Nothing is recorded unless a Metrics object
+is given to the extractor (see KeywordExtractor), so the instrumentation
+costs one None check per stage otherwise.
+
+In CLI mode a MetricsWriter dumps the metrics periodically to a file as
+json lines (one snapshot per line) or, for .prom files, as OpenMetrics
+text (replaced at each dump, eg. for the node exporter textfile
+collector). Under spark the metrics of the partitions are collected in an
+accumulator (see MetricsParam and extract_kw.process_spark).
+
+@Author: oraveczcsaba
+"""
+
+import os
+import json
+import time
+import bisect
+import timeit
+import threading
+
+COUNTERS = ('entries', 'skipped', 'short', 'nokeywords', 'cached', 'failed')
+# upper bounds of the histogram buckets: latencies from 10us to ~10s,
+# sizes up to 64k
+LATENCY_BOUNDS = tuple([0.00001 * 2 ** i for i in range(21)])
+SIZE_BOUNDS = tuple([2 ** i for i in range(17)])
+clock = timeit.default_timer
+
+
+class Histogram(object):
+    """
+    Counts of observed values in fixed buckets, with their sum.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # the last bucket is for values over the last bound
+        self.buckets = [0] * (len(bounds) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def cumulative(self):
+        """ () -> list
+
+        Return the list of (upper bound, number of values not above it)
+        pairs, the last bound is None (+Inf).
+        """
+
+        total = 0
+        result = []
+        for bound, count in zip(self.bounds + (None,), self.buckets):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def as_dict(self):
+        return {'count': self.count, 'sum': self.sum,
+                'buckets': self.cumulative()}
+
+
+class Metrics(object):
+    """
+    Counters and histograms of a KW extraction run. Can be shared by
+    threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # latency histograms by stage name, size histograms by name
+        self.stages = {}
+        self.sizes = {}
+
+    def __getstate__(self):
+        return self.counters, self.stages, self.sizes
+
+    def __setstate__(self, state):
+        self.lock = threading.Lock()
+        self.counters, self.stages, self.sizes = state
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def stage(self, name, start):
+        """ (str, float) -> float
+
+        Record the time spent in stage name since start (a clock() value)
+        and return the current clock.
+        """
+
+        now = clock()
+        with self.lock:
+            if name not in self.stages:
+                self.stages[name] = Histogram(LATENCY_BOUNDS)
+            self.stages[name].observe(now - start)
+        return now
+
+    def size(self, name, value):
+        """ (str, int) -> None
+
+        Record a per entry size.
+        """
+
+        with self.lock:
+            if name not in self.sizes:
+                self.sizes[name] = Histogram(SIZE_BOUNDS)
+            self.sizes[name].observe(value)
+
+    def merge(self, other):
+        """ (Metrics) -> Metrics
+
+        Add the counts of other to this one and return it.
+        """
+
+        with self.lock:
+            for name, value in other.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for mine, theirs in ((self.stages, other.stages),
+                                 (self.sizes, other.sizes)):
+                for name, histogram in theirs.items():
+                    if name not in mine:
+                        mine[name] = Histogram(histogram.bounds)
+                    mine[name].merge(histogram)
+        return self
+
+    def pop(self):
+        """ () -> Metrics
+
+        Return the metrics recorded so far and start over (eg. to ship
+        the metrics of a worker to the parent process).
+        """
+
+        popped = Metrics()
+        with self.lock:
+            popped.counters, popped.stages, popped.sizes = \
+                self.counters, self.stages, self.sizes
+            self.reset()
+        return popped
+
+    def as_dict(self):
+        with self.lock:
+            return {'counters': dict(self.counters),
+                    'stages': dict([(name, histogram.as_dict()) for
+                                    name, histogram in self.stages.items()]),
+                    'sizes': dict([(name, histogram.as_dict()) for
+                                   name, histogram in self.sizes.items()])}
+
+    def openmetrics(self, prefix='kw'):
+        """ (str) -> str
+
+        Return the metrics in OpenMetrics text format.
+        """
+
+        def bucket_lines(name, label, histogram):
+            lines = []
+            for bound, count in histogram.cumulative():
+                lines.append('{0}_bucket{{{1}le="{2}"}} {3}'.format(
+                    name, label, '+Inf' if bound is None else repr(bound),
+                    count))
+            labels = '{{{0}}}'.format(label.rstrip(',')) if label else ''
+            lines.append('{0}_sum{1} {2!r}'.format(name, labels,
+                                                   histogram.sum))
+            lines.append('{0}_count{1} {2}'.format(name, labels,
+                                                   histogram.count))
+            return lines
+
+        with self.lock:
+            lines = []
+            for name in sorted(self.counters):
+                lines.append('# TYPE {0}_{1} counter'.format(prefix, name))
+                lines.append('{0}_{1}_total {2}'.format(
+                    prefix, name, self.counters[name]))
+            if self.stages:
+                name = '{0}_stage_seconds'.format(prefix)
+                lines.append('# TYPE {0} histogram'.format(name))
+                lines.append('# UNIT {0} seconds'.format(name))
+                for stage in sorted(self.stages):
+                    lines.extend(bucket_lines(name,
+                                              'stage="{0}",'.format(stage),
+                                              self.stages[stage]))
+            for size in sorted(self.sizes):
+                name = '{0}_{1}'.format(prefix, size)
+                lines.append('# TYPE {0} histogram'.format(name))
+                lines.extend(bucket_lines(name, '', self.sizes[size]))
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsParam(object):
+    """
+    Spark AccumulatorParam of Metrics (see SparkContext.accumulator).
+    """
+
+    def zero(self, value):
+        return Metrics()
+
+    def addInPlace(self, value1, value2):
+        return value1.merge(value2)
+
+
+class MetricsWriter(object):
+    """
+    Periodic dumper of Metrics to a file: json lines appended, or
+    OpenMetrics text replacing the file if its name ends with .prom.
+    """
+
+    def __init__(self, filename, metrics, interval=60):
+        self.filename = filename
+        self.metrics = metrics
+        self.interval = interval
+        self.openmetrics = filename.endswith('.prom')
+        self.started = self.last = time.time()
+
+    def tick(self):
+        """ () -> None
+
+        Dump the metrics if the last dump is older than interval seconds.
+        """
+
+        if time.time() - self.last >= self.interval:
+            self.write()
+
+    def write(self):
+        """ () -> None
+
+        Dump the metrics.
+        """
+
+        self.last = now = time.time()
+        if self.openmetrics:
+            # replace at once, so readers never see a partial file
+            tmpname = '{0}.{1}.tmp'.format(self.filename, os.getpid())
+            with open(tmpname, 'w') as out:
+                out.write(self.metrics.openmetrics())
+            os.rename(tmpname, self.filename)
+        else:
+            snapshot = self.metrics.as_dict()
+            snapshot['time'] = now
+            snapshot['elapsed'] = now - self.started
+            with open(self.filename, 'a') as out:
+                out.write(json.dumps(snapshot, sort_keys=True) + '\n')
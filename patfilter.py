@@ -0,0 +1,135 @@
+# coding: utf-8
+"""
+Compiled and memoized keyword pattern filter for KW extraction.
+
+The patterns (see patterns.txt) are split into plain literals (eg.
+'http://' or 'dorfstrukt.*'), which are checked by substring search, and
+real regexps, which are compiled into one alternation. Match decisions are
+cached in a bounded LRU dict keyed by the candidate string (guarded by a
+lock, so a filter can be shared by threads). With profile set, every
+pattern is also run on its own to collect a hit/cost report.
+
+@Author: oraveczcsaba
+"""
+
+import re
+import time
+import threading
+import collections
+
+META = set('.^$*+?{}[]\\|()')
+
+
+def literal_of(pattern):
+    """ (str) -> str or None
+
+    Return the literal the pattern is equivalent to when searched for,
+    or None if it is a real regexp.
+    """
+
+    if pattern.endswith('.*'):
+        pattern = pattern[:-2]
+    if not pattern or META.intersection(pattern):
+        return None
+    return pattern
+
+
+class PatternFilter(object):
+    """
+    Matcher for the forbidden KW patterns.
+    """
+
+    def __init__(self, patterns, cachesize=100000, profile=False):
+        self.patterns = sorted(patterns)
+        self.literals = []
+        regexps = []
+        for pattern in self.patterns:
+            literal = literal_of(pattern)
+            if literal is None:
+                regexps.append(pattern)
+            else:
+                self.literals.append(literal)
+        self.regexp = re.compile('|'.join(['(?:{0})'.format(pattern) for
+                                           pattern in regexps]), re.U) \
+            if regexps else None
+        self.compiled = [(pattern, re.compile(pattern, re.U)) for
+                         pattern in self.patterns]
+        self.cachesize = cachesize
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.profile = profile
+        self.hits = dict.fromkeys(self.patterns, 0)
+        self.cost = dict.fromkeys(self.patterns, 0.0)
+        self.lookups = 0
+        self.misses = 0
+
+    def match(self, kwstring):
+        """ (str) -> bool
+
+        Return True if the candidate string (space joined KW) matches any
+        of the patterns. Patterns are checked against repr of the string.
+        """
+
+        cache = self.cache
+        with self.lock:
+            self.lookups += 1
+            if kwstring in cache:
+                # move to the end as most recently used
+                matched = cache[kwstring] = cache.pop(kwstring)
+                return matched
+            self.misses += 1
+        if self.profile:
+            with self.lock:
+                matched = self.profile_match(repr(kwstring))
+        else:
+            matched = self.search(repr(kwstring))
+        with self.lock:
+            cache[kwstring] = matched
+            if len(cache) > self.cachesize:
+                cache.popitem(last=False)
+        return matched
+
+    def search(self, kwrepr):
+        """ (str) -> bool
+
+        Return True if the repr string matches any of the patterns.
+        """
+
+        for literal in self.literals:
+            if literal in kwrepr:
+                return True
+        return self.regexp is not None and \
+            self.regexp.search(kwrepr) is not None
+
+    def profile_match(self, kwrepr):
+        """ (str) -> bool
+
+        Return True if the repr string matches any of the patterns and
+        record hits and time spent for each pattern.
+        """
+
+        matched = False
+        for pattern, regexp in self.compiled:
+            start = time.time()
+            hit = regexp.search(kwrepr) is not None
+            self.cost[pattern] += time.time() - start
+            if hit:
+                self.hits[pattern] += 1
+                matched = True
+        return matched
+
+    def report(self):
+        """ () -> str
+
+        Return a report of cache statistics and (if profiling) of the
+        hits and time spent by each pattern, costliest first.
+        """
+
+        lines = ['PATTERN CACHE:\tlookups {0}\tmisses {1}\tsize {2}'.format(
+            self.lookups, self.misses, len(self.cache))]
+        if self.profile:
+            for pattern in sorted(self.patterns, key=self.cost.get,
+                                  reverse=True):
+                lines.append('{0}\thits {1}\t{2:.6f}s'.format(
+                    repr(pattern), self.hits[pattern], self.cost[pattern]))
+        return '\n'.join(lines) + '\n'
@@ -1,9 +0,0 @@
-patterns = {
-    "^'(\\\\x..)+'$": 1,
-    'http://': 1,
-    "^'cents ": 1,
-    "^'m\\d ": 1,
-    'dorfstrukt.*': 1,
-    "^'[\\W\\d]+'$": 1,
-    "^'cent ": 1,
-    }
@@ -1,68 +0,0 @@
-postwords = {
-    'set': 1,
-    'point': 1,
-    'cents': 1,
-    'side': 1,
-    'number': 1,
-    'rest': 1,
-    'years': 1,
-    'high': 1,
-    'zero': 1,
-    'smaller': 1,
-    'long': 1,
-    'types': 1,
-    'total': 1,
-    'simple': 1,
-    'size': 1,
-    '.84': 1,
-    'group': 1,
-    'goal': 1,
-    'width': 1,
-    'ways': 1,
-    'present': 1,
-    'top': 1,
-    'visit': 1,
-    'cent': 1,
-    'day': 1,
-    'located': 1,
-    'parts': 1,
-    'York': 1,
-    'easy': 1,
-    'm2': 1,
-    'details': 1,
-    'main': 1,
-    'type': 1,
-    'kw': 1,
-    'co.': 1,
-    'back': 1,
-    'designs': 1,
-    'full': 1,
-    'form': 1,
-    'means': 1,
-    'sets': 1,
-    'site': 1,
-    'aim': 1,
-    'part': 1,
-    'Co.': 1,
-    'unit': 1,
-    'half': 1,
-    '%': 1,
-    'a.': 1,
-    'sides': 1,
-    'Inc.': 1,
-    'building': 1,
-    'feet': 1,
-    'kind': 1,
-    'places': 1,
-    'email': 1,
-    'project': 1,
-    'length': 1,
-    'important': 1,
-    'architect': 1,
-    'fact': 1,
-    'time': 1,
-    'link': 1,
-    'similar': 1,
-    'page': 1,
-    'inc.': 1,
-    }
@@ -0,0 +1,73 @@
+# coding: utf-8
+"""
+Array based RAKE scoring for KW extraction.
+
+The candidate phrases of an entry are flattened into an int array of
+token ids with a parallel array of phrase numbers. Word frequencies and
+degrees are counted by bincount over these, and phrase scores are the
+segment sums of the word scores. Whether a token is numeric (numbers do
+not add to the degree of the words of a phrase) is decided once for each
+vocabulary entry, when it first occurs in a phrase (see
+Vocabulary.numeric_flags).
+The scores are the same as those of the former dict based loops (sums
+are taken in the same order).
+
+@Author: oraveczcsaba
+"""
+
+import itertools
+import numpy as np
+
+
+def flatten(phrase_list):
+    """ (list) -> array, array
+
+    Return
+    1. the int array of the token ids of the phrases,
+    2. the array of the phrase numbers of the tokens.
+    """
+
+    lengths = np.fromiter(itertools.imap(len, phrase_list), np.int64,
+                          len(phrase_list))
+    tokens = np.fromiter(itertools.chain.from_iterable(phrase_list),
+                         np.int64, lengths.sum())
+    return tokens, np.repeat(np.arange(len(phrase_list)), lengths)
+
+
+def word_scores(tokens, phrase_ids, vocab):
+    """ (array, array, Vocabulary) -> array
+
+    Return the array of the RAKE scores (degree / frequency) of the words
+    by token id (nan for tokens not in the phrases).
+    Arguments:
+    - tokens, phrase_ids: the flattened phrases (see flatten)
+    - vocab: the Vocabulary of the tokens
+    """
+
+    numeric = vocab.numeric_flags(np.unique(tokens).tolist())
+    size = len(numeric)
+    # a view of the flags, only used here (the array may grow later)
+    numeric = np.frombuffer(numeric, np.int8) if size \
+        else np.zeros(0, np.int8)
+    freq = np.bincount(tokens, minlength=size).astype(np.float64)
+    # degree of a phrase: number of its non numeric tokens - 1
+    degree = np.bincount(phrase_ids, weights=1 - numeric[tokens],
+                         minlength=phrase_ids[-1] + 1 if len(phrase_ids)
+                         else 0) - 1
+    word_degree = np.bincount(tokens, weights=degree[phrase_ids],
+                              minlength=size) + freq  # itself
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return word_degree / freq
+
+
+def phrase_scores(phrase_list, tokens, phrase_ids, scores):
+    """ (list, array, array, array) -> dict
+
+    Return a dict of the phrases (as tuples) with their scores, the sums
+    of the scores of their words.
+    """
+
+    sums = np.bincount(phrase_ids, weights=scores[tokens],
+                       minlength=len(phrase_list))
+    return dict(itertools.izip(itertools.imap(tuple, phrase_list),
+                               sums.tolist()))
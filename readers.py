@@ -0,0 +1,116 @@
+# coding: utf-8
+"""
+Input readers for KW extraction.
+
+@Author: oraveczcsaba
+"""
+
+import re
+import json
+
+decoder = json.JSONDecoder()
+WHITESPACE = ' \t\n\r'
+NLP_KEY = re.compile(r'"description_text_nlp"\s*:\s*')
+KEYWORDS_KEY = re.compile(r'"keywords"\s*:')
+ENTRY_END = re.compile(r'}\s*]\s*$')
+
+
+def iter_json_array(file, chunksize=1 << 16):
+    """ (file, int) -> generator
+
+    Yield the elements of a json array read from file one by one, keeping
+    only the current element (plus a read chunk) in memory.
+    """
+
+    buf = ''
+    pos = 0
+    eof = False
+    expect = '['
+    while True:
+        # skip whitespace, refill buffer if consumed
+        while pos < len(buf) and buf[pos] in WHITESPACE:
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError('Unexpected end of json array input')
+            buf = file.read(chunksize)
+            pos = 0
+            eof = not buf
+            continue
+        char = buf[pos]
+        if expect == '[':
+            if char != '[':
+                raise ValueError('Input is not a json array')
+            pos += 1
+            expect = 'element'
+            continue
+        if char == ']' and expect in ('element', 'separator'):
+            return
+        if expect == 'separator':
+            if char != ',':
+                raise ValueError('Missing separator in json array at '
+                                 '{0!r}'.format(buf[pos:pos + 20]))
+            pos += 1
+            expect = 'next'
+            continue
+        try:
+            element, end = decoder.raw_decode(buf, pos)
+            if end == len(buf) and not eof:
+                # a scalar might go on in the next chunk
+                raise ValueError('Incomplete element')
+        except ValueError:
+            if eof:
+                raise
+            # element is not complete yet: read at least as much as we have
+            # to avoid rescanning long elements too many times
+            more = file.read(max(chunksize, len(buf) - pos))
+            buf = buf[pos:] + more
+            pos = 0
+            eof = not more
+            continue
+        pos = end
+        expect = 'separator'
+        yield element
+
+
+def nlp_start(line):
+    """ (str) -> int or None
+
+    Return the start position of the description_text_nlp value in a spark
+    mode input line (json encoded [id, entry] list) without decoding the
+    line, 0 if the entry has no nlp field, or None if the line has to be
+    decoded fully (the key also occurs nested, or the entry already has
+    keywords).
+    """
+
+    keys = [match.end() for match in NLP_KEY.finditer(line)]
+    if not keys:
+        return 0
+    if len(keys) > 1 or KEYWORDS_KEY.search(line) or \
+            not ENTRY_END.search(line) or line[keys[0]:keys[0] + 1] != '{':
+        return None
+    return keys[0]
+
+
+def line_id(line):
+    """ (str) -> object
+
+    Return the id (first element) of a spark mode input line (json encoded
+    [id, entry] list) without decoding the entry.
+    """
+
+    start = line.index('[') + 1
+    while line[start] in WHITESPACE:
+        start += 1
+    return decoder.raw_decode(line, start)[0]
+
+
+def count_tokens(text, start=0):
+    """ (str, int) -> int
+
+    Return an upper bound of the number of tokens of the json encoded
+    description_text_nlp value starting at start in text (the number of
+    POS keys in the rest of the text).
+    """
+
+    return text.count('"POS"', start)
@@ -0,0 +1,122 @@
+# coding: utf-8
+"""
+Hot reload of the KW extraction parameters and resources.
+
+An ExtractorReloader watches kw.cfg and the resource files (stoplist.txt,
+postlist.txt, patterns.txt) of a long running process and builds a new
+KeywordExtractor when any of them changes. The new extractor (with freshly
+compiled resource tables, see resources.py) replaces the old one at once:
+callers take the current extractor once per batch (see current), so work
+in flight finishes with the extractor it started with.
+A change is taken only after the files have been the same for one check
+interval, so half written files are not loaded, and if the new extractor
+can not be built (eg. a broken kw.cfg), the old one is kept.
+
+Every extractor has a version stamp (see KeywordExtractor.version), a
+hash of its parameters and resources, which the line modes of extract_kw.py
+record on the outputs (--reload option).
+
+@Author: oraveczcsaba
+"""
+
+import os
+import sys
+import time
+import threading
+from resources import resource_path, SOURCES
+
+
+def watched_files():
+    """ () -> list
+
+    Return the paths of kw.cfg and the resource files.
+    """
+
+    return [resource_path('kw.cfg')] + \
+        [resource_path(SOURCES[name][0]) for
+         name in ('stopwords', 'postwords', 'patterns')]
+
+
+def file_signature(filename):
+    """ (str) -> tuple
+
+    Return the (inode, size, mtime) signature of a file (None if it is
+    missing).
+    """
+
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime
+
+
+class ExtractorReloader(object):
+    """
+    Holder of the current KeywordExtractor of a long running process,
+    rebuilding it when its files change. Can be shared by threads.
+    """
+
+    def __init__(self, factory, interval=5, filenames=None):
+        """
+        Arguments:
+        - factory: function returning a new KeywordExtractor (reading
+          kw.cfg and the resource files)
+        - interval: seconds between two checks of the files
+        - filenames: the watched files (see watched_files by default)
+        """
+
+        self.factory = factory
+        self.interval = interval
+        self.filenames = filenames or watched_files()
+        self.lock = threading.Lock()
+        self.signatures = self.scan()
+        self.pending = None
+        self.extractor = factory()
+        self.checked = time.time()
+
+    def scan(self):
+        return [file_signature(filename) for filename in self.filenames]
+
+    def current(self):
+        """ () -> KeywordExtractor
+
+        Return the current extractor, reloading it first if the files have
+        changed.
+        """
+
+        if time.time() - self.checked >= self.interval:
+            with self.lock:
+                if time.time() - self.checked >= self.interval:
+                    self.check()
+        return self.extractor
+
+    def check(self):
+        """ () -> bool
+
+        Reload the extractor if the files have changed and settled since
+        the last check. Return True if it was replaced.
+        """
+
+        self.checked = time.time()
+        signatures = self.scan()
+        if signatures == self.signatures:
+            self.pending = None
+            return False
+        if signatures != self.pending:
+            # changed since the last check: wait until it settles
+            self.pending = signatures
+            return False
+        self.pending = None
+        self.signatures = signatures
+        try:
+            extractor = self.factory()
+        except Exception as e:
+            sys.stderr.write('Reload failed, keeping version {0}: '
+                             '{1}\n'.format(self.extractor.version, e))
+            return False
+        if extractor.version != self.extractor.version:
+            sys.stderr.write('Reloaded version {0} (was {1})\n'.format(
+                extractor.version, self.extractor.version))
+        self.extractor = extractor
+        return True
@@ -0,0 +1,237 @@
+# coding: utf-8
+"""
+Compiled resource tables for KW extraction.
+
+The stopword, postword and pattern lists (stoplist.txt, postlist.txt,
+patterns.txt) are compiled into binary sorted string tables (.kwr files
+next to the sources): a header with the sha1 of the source file and the
+number of entries, the offsets of the entries, and the utf-8 entries
+themselves, sorted and \\0 separated. A table is memory mapped (the
+processes using it share the pages of the file), and it is compiled again
+only if the hash of its source changes (or by make_stoplist.py), so
+loading it costs no parsing.
+
+The extractor takes the entries of a table as a frozenset (made by one
+split of the mapped entries), as membership tests are in its inner loops.
+The frozensets live on the heap of a process: they are built once per
+version of a table in a process (load_resources keeps them for the next
+extractors, eg. reloaded ones), and processes forked after they are built
+(the -j workers of extract_kw.py) share them copy-on-write until a table
+changes. Other processes (eg. spark executors) build their own.
+StringTable itself supports binary search lookups without loading.
+
+@Author: oraveczcsaba
+"""
+
+import os
+import mmap
+import bisect
+import struct
+import hashlib
+from pkg_resources import resource_filename
+
+MAGIC = 'KWTABLE1'
+HEADER = struct.Struct('<8s20sI')
+OFFSET = struct.Struct('<I')
+# resource name: (source file, kind of source)
+SOURCES = {'stopwords': ('stoplist.txt', 'words'),
+           'postwords': ('postlist.txt', 'words'),
+           'patterns': ('patterns.txt', 'lines')}
+# resource name: (table digest, frozenset of the entries) of the tables
+# loaded by the process
+loaded = {}
+
+
+def resource_path(filename):
+    """ (str) -> str
+
+    Return the path of a resource file (in the pipeline package if
+    present).
+    """
+
+    try:
+        import pipeline.spark.spark_utils
+        return resource_filename("pipeline.projects.kbd", filename)
+    except ImportError:
+        return resource_filename(__name__, filename)
+
+
+def parse_words(text):
+    """ (str) -> set
+
+    Return the set of the whitespace separated words of a word list
+    (lines starting with # are comments).
+    """
+
+    words = set()
+    for line in text.splitlines():
+        if line.strip()[:1] != "#":
+            words.update(line.split())
+    return words
+
+
+def parse_lines(text):
+    """ (str) -> set
+
+    Return the set of the lines of a pattern list, keeping whitespace
+    (lines starting with # and empty lines are skipped).
+    """
+
+    return set([line for line in text.split('\n')
+                if line.strip()[:1] != "#" and line and not line.isspace()])
+
+
+def table_path(source):
+    """ (str) -> str
+
+    Return the path of the compiled table of source.
+    """
+
+    return os.path.splitext(source)[0] + '.kwr'
+
+
+def compile_table(source, kind):
+    """ (str, str) -> str
+
+    Return the compiled table (file content) of the source file of kind
+    'words' or 'lines'.
+    """
+
+    with open(source) as infile:
+        text = infile.read()
+    entries = sorted(parse_lines(text) if kind == 'lines'
+                     else parse_words(text))
+    offsets = [0]
+    for entry in entries:
+        offsets.append(offsets[-1] + len(entry) + 1)
+    return ''.join([HEADER.pack(MAGIC, hashlib.sha1(text).digest(),
+                                len(entries)),
+                    struct.pack('<{0}I'.format(len(offsets)), *offsets),
+                    '\0'.join(entries), '\0' if entries else ''])
+
+
+def write_table(source, kind, target=None):
+    """ (str, str, str) -> str
+
+    Compile source into target (the .kwr next to source by default),
+    replacing it at once, and return the path of target.
+    """
+
+    target = target or table_path(source)
+    # concurrent writers (eg. reloading workers) use their own temp file
+    tmpname = '{0}.{1}.tmp'.format(target, os.getpid())
+    try:
+        with open(tmpname, 'wb') as out:
+            out.write(compile_table(source, kind))
+        os.rename(tmpname, target)
+    except (IOError, OSError):
+        if os.path.exists(tmpname):
+            os.remove(tmpname)
+        raise
+    return target
+
+
+def source_digest(source):
+    """ (str) -> str
+
+    Return the sha1 digest of the source file.
+    """
+
+    with open(source) as infile:
+        return hashlib.sha1(infile.read()).digest()
+
+
+class StringTable(object):
+    """
+    Sorted string table of a compiled resource (mapped file or string).
+    """
+
+    def __init__(self, data):
+        self.data = data
+        magic, self.digest, self.count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('Not a compiled resource table')
+        self.offsets = HEADER.size
+        self.start = self.offsets + OFFSET.size * (self.count + 1)
+
+    @classmethod
+    def open(cls, filename):
+        """ (str) -> StringTable
+
+        Return the table of a compiled file, mapped read only.
+        """
+
+        with open(filename, 'rb') as infile:
+            return cls(mmap.mmap(infile.fileno(), 0,
+                                 access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        start, end = struct.unpack_from('<II', self.data, self.offsets +
+                                        OFFSET.size * index)
+        return self.data[self.start + start:self.start + end - 1]
+
+    def __contains__(self, entry):
+        index = bisect.bisect_left(self, entry)
+        return index < self.count and self[index] == entry
+
+    def __iter__(self):
+        return iter(self.entries())
+
+    def entries(self):
+        """ () -> list
+
+        Return the sorted list of all entries.
+        """
+
+        if not self.count:
+            return []
+        return self.data[self.start:len(self.data) - 1].split('\0')
+
+    def frozenset(self):
+        return frozenset(self.entries())
+
+
+def load_table(name, source=None):
+    """ (str, str) -> StringTable
+
+    Return the table of the resource name (see SOURCES), compiling it
+    from source (the resource file by default) if it is missing or was
+    compiled from a different version of the source. If the table can not
+    be written, it is compiled in memory.
+    """
+
+    filename, kind = SOURCES[name]
+    source = source or resource_path(filename)
+    target = table_path(source)
+    if os.path.exists(target):
+        table = StringTable.open(target)
+        if not os.path.exists(source) or \
+                table.digest == source_digest(source):
+            return table
+    try:
+        return StringTable.open(write_table(source, kind, target))
+    except (IOError, OSError):
+        return StringTable(compile_table(source, kind))
+
+
+def load_resources():
+    """ () -> frozenset, frozenset, frozenset
+
+    Return the stopwords, postwords and patterns of the resource files.
+    The frozensets of a table are built once per version of the table.
+    """
+
+    resources = []
+    for name in ('stopwords', 'postwords', 'patterns'):
+        table = load_table(name)
+        digest, entries = loaded.get(name, (None, None))
+        if digest != table.digest:
+            entries = table.frozenset()
+            loaded[name] = (table.digest, entries)
+        resources.append(entries)
+    return tuple(resources)
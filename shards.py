@@ -0,0 +1,204 @@
+# coding: utf-8
+"""
+Byte range sharding and entry offset index of json lines input.
+
+A json lines dump ([id, entry] lines, see extract_kw.py -a) is memory
+mapped and split into N byte ranges aligned to line starts: shard K of N
+is made of the lines starting in the K-th of N equal byte ranges, so the
+shards cover every line once without reading the file to split it.
+
+An EntryIndex stores the byte offset and length of the line of each entry
+id of a dump in an sqlite file, so a few entries can be read back from a
+large dump without scanning it. The index records the size and mtime of
+the dump and is built again if they change.
+
+@Author: oraveczcsaba
+"""
+
+import os
+import mmap
+import sqlite3
+from readers import line_id
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id TEXT PRIMARY KEY,
+    offset INTEGER,
+    length INTEGER);
+CREATE TABLE IF NOT EXISTS source (
+    name TEXT PRIMARY KEY,
+    value);
+"""
+
+
+def parse_shard(text):
+    """ (str) -> int, int
+
+    Return the shard number K and the number of shards N of a 'K/N'
+    string (1 <= K <= N), raising a ValueError if it is invalid.
+    """
+
+    shard, _, shards = text.partition('/')
+    shard, shards = int(shard), int(shards)
+    if not 1 <= shard <= shards:
+        raise ValueError('Invalid shard: {0}'.format(text))
+    return shard, shards
+
+
+def map_file(filename):
+    """ (str) -> mmap or str
+
+    Return the content of a file mapped read only (an empty string for an
+    empty file, which can not be mapped).
+    """
+
+    with open(filename, 'rb') as infile:
+        if not os.fstat(infile.fileno()).st_size:
+            return ''
+        return mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def line_start(data, position):
+    """ (mmap, int) -> int
+
+    Return the position of the first line starting at or after position.
+    """
+
+    if position <= 0:
+        return 0
+    newline = data.find('\n', position - 1)
+    return len(data) if newline < 0 else newline + 1
+
+
+def shard_range(data, shard, shards):
+    """ (mmap, int, int) -> int, int
+
+    Return the start and end positions of shard (1 based) of shards in
+    data.
+    """
+
+    size = len(data)
+    return (line_start(data, size * (shard - 1) // shards),
+            line_start(data, size * shard // shards))
+
+
+def iter_lines(data, start=0, end=None):
+    """ (mmap, int, int) -> generator
+
+    Yield the lines of data from start to end (at line starts).
+    """
+
+    end = len(data) if end is None else end
+    while start < end:
+        newline = data.find('\n', start, end)
+        stop = end if newline < 0 else newline + 1
+        yield data[start:stop]
+        start = stop
+
+
+def shard_lines(filename, shard, shards):
+    """ (str, int, int) -> generator
+
+    Yield the lines of shard (1 based) of shards of a json lines file.
+    """
+
+    data = map_file(filename)
+    start, end = shard_range(data, shard, shards)
+    return iter_lines(data, start, end)
+
+
+class EntryIndex(object):
+    """
+    Byte offsets and lengths of the lines of the entries of a json lines
+    file by entry id, in an sqlite file.
+    """
+
+    def __init__(self, filename, source):
+        """
+        Arguments:
+        - filename: the index file
+        - source: the indexed json lines file
+        """
+
+        self.filename = filename
+        self.source = source
+        self.connection = sqlite3.connect(filename)
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+
+    def signature(self):
+        stat = os.stat(self.source)
+        return [('size', stat.st_size), ('mtime', stat.st_mtime)]
+
+    def is_current(self):
+        """ () -> bool
+
+        Return True if the index was built from the current source.
+        """
+
+        return dict(self.connection.execute(
+            'SELECT name, value FROM source')) == dict(self.signature())
+
+    def build(self, batchsize=10000):
+        """ () -> int
+
+        Index the entries of the source (the first line of an id wins) and
+        return the number of lines indexed.
+        """
+
+        signature = self.signature()
+        data = map_file(self.source)
+        count = 0
+        with self.connection:
+            self.connection.execute('DELETE FROM entries')
+            self.connection.execute('DELETE FROM source')
+            rows = []
+            start = 0
+            for line in iter_lines(data):
+                if line.strip():
+                    rows.append((unicode(line_id(line)), start,
+                                 len(line.rstrip('\r\n'))))
+                start += len(line)
+                if len(rows) >= batchsize:
+                    count += self.insert(rows)
+                    rows = []
+            count += self.insert(rows)
+            self.connection.executemany('INSERT INTO source VALUES (?, ?)',
+                                        signature)
+        return count
+
+    def insert(self, rows):
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO entries VALUES (?, ?, ?)', rows)
+        return len(rows)
+
+    def update(self):
+        """ () -> int or None
+
+        Build the index if it is not current, return the number of lines
+        indexed (None if it was current).
+        """
+
+        return None if self.is_current() else self.build()
+
+    def lines(self, ids):
+        """ (list) -> list, list
+
+        Return the lines of the entries with ids (read from the source in
+        file order), and the list of the ids not found.
+        """
+
+        ids = [unicode(entry_id) for entry_id in ids]
+        found = {}
+        # stay under the sqlite limit of host parameters
+        for start in xrange(0, len(ids), 500):
+            part = ids[start:start + 500]
+            found.update([(entry_id, (offset, length)) for
+                          entry_id, offset, length in self.connection.execute(
+                              'SELECT id, offset, length FROM entries WHERE '
+                              'id IN ({0})'.format(','.join('?' * len(part))),
+                              part)])
+        data = map_file(self.source)
+        lines = [data[offset:offset + length] + '\n' for
+                 offset, length in sorted(set(found.values()))]
+        return lines, [entry_id for entry_id in ids if entry_id not in found]
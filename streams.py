@@ -0,0 +1,252 @@
+# coding: utf-8
+"""
+Compressed input and output streams for KW extraction.
+
+Input compressed with gzip, bzip2 or xz is detected by its magic bytes
+and decompressed by the gzip, bzip2 or xz tool in a child process, so
+decompression runs in parallel with the extraction (the same for the
+compression of the output). Uncompressed input is read directly.
+Output to a compressor is written by a thread from a bounded queue, so
+the extraction goes on while the compressor takes the previous output.
+
+@Author: oraveczcsaba
+"""
+
+import os
+import sys
+import Queue
+import signal
+import threading
+import subprocess
+
+CHUNKSIZE = 1 << 16
+# number of output chunks waiting for the compressor
+WRITEQUEUE = 8
+# magic bytes of the compressed formats
+MAGIC = (('\x1f\x8b', 'gzip'), ('BZh', 'bzip2'), ('\xfd7zXZ\x00', 'xz'))
+SUFFIXES = {'.gz': 'gzip', '.bz2': 'bzip2', '.xz': 'xz'}
+COMPRESSIONS = ('gzip', 'bzip2', 'xz')
+
+
+def detect_compression(head):
+    """ (str) -> str or None
+
+    Return the compression format of data starting with head, None if it
+    is not compressed.
+    """
+
+    for magic, compression in MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def default_sigpipe():
+    # python ignores SIGPIPE, the tools should die on it as usual
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+
+def start_tool(command, stdin, stdout):
+    """ (list, file, file) -> Popen
+
+    Start a compression tool, raising an IOError if it is missing.
+    """
+
+    try:
+        return subprocess.Popen(command, stdin=stdin, stdout=stdout,
+                                bufsize=-1, close_fds=True,
+                                preexec_fn=default_sigpipe)
+    except OSError as e:
+        raise IOError('Can not run {0}: {1}'.format(command[0], e))
+
+
+def feed(prefix, infile):
+    """ (str, file) -> int, int
+
+    Return the read end of a pipe and the pid of the child process writing
+    prefix and the rest of infile to it. The write end is only open in the
+    child, so processes forked later (eg. workers) do not keep the pipe
+    open after the child is done.
+    """
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            # the buffer of infile is inherited, nothing is lost
+            with os.fdopen(write_fd, 'wb') as out:
+                out.write(prefix)
+                for data in iter(lambda: infile.read(CHUNKSIZE), ''):
+                    out.write(data)
+        finally:
+            # the reader died if this fails, it reports the error
+            os._exit(0)
+    os.close(write_fd)
+    return read_fd, pid
+
+
+class InputStream(object):
+    """
+    Input file or stdin, decompressed if needed. Can be read by read() or
+    iterated by lines.
+    """
+
+    def __init__(self, filename=None):
+        """
+        Arguments:
+        - filename: the input file, stdin if None or '-'
+        """
+
+        self.process = None
+        self.feeder = None
+        self.prefix = ''
+        if filename in (None, '-', sys.stdin):
+            self.name = '<stdin>'
+            infile = sys.stdin
+            # stdin can not be rewound: the head read is kept as prefix
+            head = infile.read(len(MAGIC[-1][0]))
+        else:
+            self.name = filename
+            infile = open(filename, 'rb')
+            head = infile.read(len(MAGIC[-1][0]))
+            infile.seek(0)
+        self.compression = detect_compression(head)
+        if self.compression is None:
+            self.file = infile
+            if infile is sys.stdin:
+                self.prefix = head
+            return
+        command = [self.compression, '-dc']
+        if infile is sys.stdin:
+            # the decompressor reads the head and the rest of stdin from
+            # a feeder process
+            read_fd, self.feeder = feed(head, infile)
+            self.process = start_tool(command, read_fd, subprocess.PIPE)
+            os.close(read_fd)
+        else:
+            self.process = start_tool(command, infile, subprocess.PIPE)
+            infile.close()
+        self.file = self.process.stdout
+
+    def read(self, size=-1):
+        if not self.prefix:
+            return self.file.read(size)
+        if 0 <= size <= len(self.prefix):
+            data, self.prefix = self.prefix[:size], self.prefix[size:]
+            return data
+        data, self.prefix = self.prefix, ''
+        return data + self.file.read(size - len(data) if size > 0 else -1)
+
+    def __iter__(self):
+        if not self.prefix:
+            return iter(self.file)
+        return self.lines()
+
+    def lines(self):
+        # complete the line(s) of the prefix before reading on
+        prefix, self.prefix = self.prefix, ''
+        for line in (prefix + self.file.readline()).splitlines(True):
+            yield line
+        for line in self.file:
+            yield line
+
+    def close(self):
+        """ () -> None
+
+        Close the input, raising an IOError if the decompression failed.
+        """
+
+        if self.process is None:
+            if self.file is not sys.stdin:
+                self.file.close()
+            return
+        self.file.close()
+        if self.feeder is not None:
+            os.waitpid(self.feeder, 0)
+        # killed by SIGPIPE if the input was not read to the end
+        if self.process.wait() not in (0, -signal.SIGPIPE):
+            raise IOError('Decompression of {0} failed: {1} exited with '
+                          '{2}'.format(self.name, self.compression,
+                                       self.process.returncode))
+
+
+class OutputStream(object):
+    """
+    Output file or stdout, compressed if a compression is given (or the
+    file name ends with .gz, .bz2 or .xz).
+    """
+
+    def __init__(self, filename=None, compression=None, level=None):
+        """
+        Arguments:
+        - filename: the output file, stdout if None or '-'
+        - compression: gzip, bzip2 or xz
+        - level: compression level (1-9, the default of the tool if None)
+        """
+
+        if filename in (None, '-'):
+            self.file = sys.stdout
+        else:
+            self.file = open(filename, 'wb')
+            compression = compression or \
+                SUFFIXES.get(os.path.splitext(filename)[1])
+        self.compression = compression
+        self.process = None
+        if compression is None:
+            self.out = self.file
+        else:
+            command = [compression, '-c']
+            if level is not None:
+                command.append('-{0}'.format(level))
+            self.file.flush()
+            self.process = start_tool(command, subprocess.PIPE, self.file)
+            self.out = self.process.stdin
+            self.queue = Queue.Queue(WRITEQUEUE)
+            self.error = None
+            self.writer = threading.Thread(target=self.run)
+            self.writer.daemon = True
+            self.writer.start()
+
+    def run(self):
+        # data is written in the writer thread, None stops it
+        for data in iter(self.queue.get, None):
+            if self.error is None:
+                try:
+                    self.out.write(data)
+                except IOError as e:
+                    self.error = e
+
+    def write(self, data):
+        if self.process is None:
+            self.out.write(data)
+            return
+        if self.error is not None:
+            raise self.error
+        self.queue.put(data)
+
+    def flush(self):
+        if self.process is None:
+            self.out.flush()
+
+    def close(self):
+        """ () -> None
+
+        Flush and close the output (stdout is only flushed), raising an
+        IOError if the compression failed.
+        """
+
+        if self.process is not None:
+            self.queue.put(None)
+            self.writer.join()
+            if self.error is not None:
+                raise self.error
+            self.out.close()
+            if self.process.wait():
+                raise IOError('Compression failed: {0} exited with '
+                              '{1}'.format(self.compression,
+                                           self.process.returncode))
+        if self.file is sys.stdout:
+            self.file.flush()
+        else:
+            self.file.close()
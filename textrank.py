@@ -0,0 +1,131 @@
+# coding: utf-8
+"""
+Array based TextRank engine for KW extraction.
+
+The word cooccurrence graph is stored as integer indexed CSR arrays: for
+each node, the column indexes of the nodes linking to it (its incidents),
+in the order the edges first occur in the text. PageRank is computed as
+pygraph's pagerank did: an in-place (Gauss-Seidel) sweep over the nodes,
+summing the incident contributions in edge order, until the sum of
+absolute changes of a sweep gets below tolerance. Edge semantics follow
+pygraph's digraph too (duplicate edges are dropped, self loops are kept,
+rank of nodes without outbound links is not redistributed), and the nodes
+are swept in the order of pygraph's node dict (see dict_order), so the
+scores are the same floats as with the former pygraph setup.
+
+@Author: oraveczcsaba
+"""
+
+import numpy as np
+
+
+def dict_order(keys):
+    """ (list) -> list
+
+    Return the indexes of the (distinct) keys in the iteration order of a
+    dict of them inserted in order. pygraph keeps the nodes of a graph and
+    their scores in such dicts, and sweeps the nodes in this order.
+    """
+
+    positions = {}
+    for index, key in enumerate(keys):
+        positions[key] = index
+    return positions.values()
+
+
+def build_graph(text, window):
+    """ (list, int) -> list, array, array
+
+    Return
+    1. the list of nodes (unique words of text in order of appearance),
+    2. the CSR row pointer array of the incidents of the nodes,
+    3. the CSR column index array of the incidents of the nodes.
+    Edges go from each word to the words following it within window, the
+    incidents of a node are in the order their edges first occur in text.
+    """
+
+    node_ids = {}
+    nodes = []
+    ids = np.empty(len(text), dtype=np.int64)
+    for i, word in enumerate(text):
+        node_id = node_ids.get(word)
+        if node_id is None:
+            node_id = node_ids[word] = len(nodes)
+            nodes.append(word)
+        ids[i] = node_id
+    numnodes = len(nodes)
+    indptr = np.zeros(numnodes + 1, dtype=np.int64)
+    # edges for all offsets within window, the shrinking windows at the
+    # end of text come for free with the slicing
+    offsets = [offset for offset in range(1, window) if offset < len(ids)]
+    if not offsets:
+        return nodes, indptr, np.zeros(0, dtype=np.int64)
+    edges = np.concatenate([ids[:-offset] * numnodes + ids[offset:]
+                            for offset in offsets])
+    # position of the edges in the scan of text (word by word, then
+    # offset by offset)
+    scan = np.concatenate([np.arange(len(ids) - offset) * window + offset
+                           for offset in offsets])
+    edges = edges[np.argsort(scan, kind='mergesort')]
+    # remove duplicate edges, keeping them in order of first occurrence
+    first = np.unique(edges, return_index=True)[1]
+    edges = edges[np.sort(first)]
+    targets = edges % numnodes
+    indices = (edges // numnodes)[np.argsort(targets, kind='mergesort')]
+    np.cumsum(np.bincount(targets, minlength=numnodes), out=indptr[1:])
+    return nodes, indptr, indices
+
+
+def pagerank_batch(graphs, damping=0.85,
+                   max_iterations=100, tolerance=0.00001, orders=None):
+    """ (list, float, int, float, list) -> list
+
+    Return a list of dicts of nodes with their PageRank scores, one for
+    each input (nodes, indptr, indices) graph. Each graph is converged on
+    its own (see pagerank), orders are the sweep orders of the graphs.
+    """
+
+    orders = orders or [None] * len(graphs)
+    return [pagerank(nodes, indptr, indices, damping=damping,
+                     max_iterations=max_iterations, tolerance=tolerance,
+                     order=order)
+            for (nodes, indptr, indices), order in zip(graphs, orders)]
+
+
+def pagerank(nodes, indptr, indices, damping=0.85,
+             max_iterations=100, tolerance=0.00001, order=None):
+    """ (list, array, array, float, int, float, list) -> dict
+
+    Return a dict of nodes with their PageRank scores.
+    Scores are updated in place, node by node in order (node indexes,
+    by default in order of appearance), and iteration stops if the sum of
+    absolute changes of a sweep gets below tolerance or after
+    max_iterations.
+    """
+
+    numnodes = len(nodes)
+    if not numnodes:
+        return {}
+    # value for nodes without inbound links
+    min_value = (1.0 - damping) / numnodes
+    ranks = [1.0 / numnodes] * numnodes
+    outdegree = np.bincount(indices, minlength=numnodes).tolist()
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+    incidents = [indices[indptr[node]:indptr[node + 1]]
+                 for node in xrange(numnodes)]
+    sweep = [(node, incidents[node]) for node in
+             (xrange(numnodes) if order is None else order)]
+    for _ in xrange(max_iterations):
+        diff = 0
+        for node, sources in sweep:
+            rank = min_value
+            # the same operations in the same order as pygraph, so the
+            # same rounding
+            for source in sources:
+                rank += damping * ranks[source] / outdegree[source]
+            diff += abs(ranks[node] - rank)
+            ranks[node] = rank
+        if diff < tolerance:
+            break
+    return dict(zip(nodes, ranks))
@@ -0,0 +1,107 @@
+# coding: utf-8
+"""
+Token vocabulary for KW extraction.
+
+Words (and lemmas) of an entry are interned to int ids once, and all
+internal dicts and graphs of the extraction are keyed by these ids (or
+tuples of them). Strings are only looked up again for the filters and the
+output. Ids are given in order of first appearance.
+
+@Author: oraveczcsaba
+"""
+
+from array import array
+from kw_helpers import isNumeric
+
+
+class Vocabulary(object):
+    """
+    Mapping between tokens and int ids.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.words = []
+        # input (unicode) tokens seen
+        self.tokens = {}
+        self.lowered = {}
+        # numeric flags by id, -1 if not known yet (see numeric_flags)
+        self.numeric = array('b')
+
+    def __len__(self):
+        return len(self.words)
+
+    def intern(self, token):
+        """ (unicode or str) -> int
+
+        Return the id of token, adding it if new. Unicode tokens are
+        stored utf-8 encoded.
+        """
+
+        if isinstance(token, unicode):
+            token_id = self.tokens.get(token)
+            if token_id is None:
+                token_id = self.tokens[token] = self.intern(
+                    token.encode('utf-8'))
+            return token_id
+        token_id = self.ids.get(token)
+        if token_id is None:
+            token_id = self.ids[token] = len(self.words)
+            self.words.append(token)
+        return token_id
+
+    def lower(self, token_id):
+        """ (int) -> int
+
+        Return the id of the lower cased form of token.
+        """
+
+        lower_id = self.lowered.get(token_id)
+        if lower_id is None:
+            lower_id = self.lowered[token_id] = self.intern(
+                self.words[token_id].lower())
+        return lower_id
+
+    def numeric_flags(self, ids):
+        """ (iterable) -> array
+
+        Return the array of flags (1 if numeric, -1 if not known) of the
+        tokens by id, with the tokens of ids classified. Each token is
+        classified once.
+        """
+
+        numeric = self.numeric
+        if len(numeric) < len(self.words):
+            numeric.extend([-1] * (len(self.words) - len(numeric)))
+        words = self.words
+        for token_id in ids:
+            if numeric[token_id] < 0:
+                numeric[token_id] = isNumeric(words[token_id])
+        return numeric
+
+    def select(self, words):
+        """ (dict) -> set
+
+        Return the set of ids of the tokens present in words.
+        """
+
+        return set([token_id for token_id, word in enumerate(self.words)
+                    if word in words])
+
+    def join(self, ids):
+        """ (tuple) -> str
+
+        Return the space joined string of the tokens.
+        """
+
+        return " ".join([self.words[token_id] for token_id in ids])
+
+    def decode(self, indict):
+        """ (dict) -> dict
+
+        Return the input dict keyed by tuples of tokens instead of ids.
+        """
+
+        words = self.words
+        return dict([(tuple([words[token_id] for token_id in key]), value)
+                     for key, value in indict.iteritems()])